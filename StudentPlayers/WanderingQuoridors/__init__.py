@@ -86,7 +86,7 @@ def get_neighbors(playerData, r, c):
             away.
     """
     
-    return [x for x in playerData.currentboard.board[r,c]]
+    return [x for x in playerData.currentboard.getAdjacent((r,c))]
 
 def get_shortest_path(playerData, r1, c1, r2, c2):
     """
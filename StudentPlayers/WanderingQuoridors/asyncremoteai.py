@@ -0,0 +1,274 @@
+"""
+Asyncio client for the AI server that multiplexes many games over a small pool of connections.
+Uses the multiplexed protocol described in remoteai, so it needs the Python server.
+MuxRemoteAI wraps it in the same blocking interface as RemoteAI.
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+import asyncio
+import threading
+import atexit
+import concurrent.futures
+from collections import deque
+from itertools import count
+from .remoteai import RemoteAI, PORT, HELLO_MUX, formatHeader, formatMove, parseMove, parseLocs
+
+class MuxConnection:
+	"""
+	One connection to the AI server, shared by many games.
+	Replies are matched to requests by game id; each game's replies come back in the order it sent its requests.
+	"""
+	
+	def __init__(self, host, port=PORT):
+		self.host = host
+		self.port = port
+		self.reader = None
+		self.writer = None
+		self.readtask = None
+		# Futures waiting for replies, by game id
+		self.waiting = {}
+	
+	async def open(self):
+		self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+		self.writer.write(bytes(HELLO_MUX + "\n", "ascii"))
+		line = await self.reader.readline()
+		if str(line, "ascii").rstrip("\r\n") != HELLO_MUX:
+			self.writer.close()
+			raise RemoteAI.error("Server doesn't support multiplexing")
+		self.readtask = asyncio.ensure_future(self._readLoop())
+	
+	@property
+	def isOpen(self):
+		return self.readtask is not None and not self.readtask.done()
+	
+	async def _readLoop(self):
+		try:
+			while True:
+				line = await self.reader.readline()
+				if not line.endswith(b"\n"):
+					break
+				gameid, _, reply = str(line, "ascii").rstrip("\r\n").partition(" ")
+				waiting = self.waiting.get(gameid)
+				if waiting:
+					future = waiting.popleft()
+					if not future.cancelled():
+						future.set_result(reply)
+		finally:
+			for waiting in self.waiting.values():
+				for future in waiting:
+					if not future.done():
+						future.set_exception(RemoteAI.error("Disconnected from server"))
+			self.waiting.clear()
+	
+	def send(self, gameid, line):
+		"""
+		Sends a command line for gameid. Returns a future for the reply line.
+		"""
+		future = asyncio.get_event_loop().create_future()
+		if not self.isOpen:
+			future.set_exception(RemoteAI.error("Disconnected from server"))
+			return future
+		self.waiting.setdefault(gameid, deque()).append(future)
+		self.writer.write(bytes("{} {}".format(gameid, line), "ascii"))
+		return future
+	
+	async def close(self):
+		if self.writer:
+			self.writer.close()
+			self.writer = None
+		if self.readtask:
+			self.readtask.cancel()
+			try:
+				await self.readtask
+			except asyncio.CancelledError:
+				pass
+			self.readtask = None
+
+class AsyncRemoteAI:
+	"""
+	One game played through a MuxConnection. Notifications are pipelined: they return without waiting,
+	and their acks are checked before the reply to the next request.
+	"""
+	
+	def __init__(self, connection, gameid):
+		self.connection = connection
+		self.gameid = gameid
+		self.pending = []
+		self.me = None
+	
+	def _check(self, reply):
+		if reply.startswith("err"):
+			raise RemoteAI.error("Server error: "+reply[4:])
+		return reply
+	
+	async def sync(self):
+		"""
+		Waits for the server to acknowledge every notification sent so far.
+		"""
+		pending, self.pending = self.pending, []
+		for future in pending:
+			if self._check(await future) != "ack":
+				raise RemoteAI.error("Received a bad ACK")
+	
+	async def _request(self, line):
+		future = self.connection.send(self.gameid, line)
+		await self.sync()
+		return self._check(await future)
+	
+	async def connect(self, me, walls, locations):
+		self.me = me
+		if await self._request("new "+formatHeader(me, walls, locations)) != "ack":
+			raise RemoteAI.error("Received a bad ACK")
+	
+	def sendMove(self, move):
+		self.pending.append(self.connection.send(self.gameid, formatMove(move)))
+	
+	def sendInvalidate(self, plyid):
+		self.pending.append(self.connection.send(self.gameid, "i {}\n".format(plyid)))
+	
+	async def getMove(self):
+		return parseMove(await self._request("g\n"), self.me)
+	
+	async def getAdjacent(self, r,c):
+		return parseLocs(await self._request("adj {},{}\n".format(r,c)))
+	
+	async def getPath(self, r1,c1, r2,c2):
+		return parseLocs(await self._request("path {},{} {},{}\n".format(r1,c1, r2,c2)))
+	
+	async def close(self):
+		if self.connection.isOpen:
+			await self._request("end\n")
+
+class MuxPool:
+	"""
+	Spreads games over up to size connections to one server. Connections are opened when first needed.
+	"""
+	
+	def __init__(self, host, size=4, port=PORT):
+		self.host = host
+		self.port = port
+		self.connections = [None]*size
+		self.gameids = count(1)
+		self.lock = None
+	
+	async def newGame(self, me, walls, locations):
+		"""
+		Starts a game on the next connection in turn and returns its AsyncRemoteAI
+		"""
+		if self.lock is None:
+			self.lock = asyncio.Lock()
+		gameid = str(next(self.gameids))
+		i = int(gameid) % len(self.connections)
+		async with self.lock:
+			connection = self.connections[i]
+			if connection is None or not connection.isOpen:
+				connection = MuxConnection(self.host, self.port)
+				await connection.open()
+				self.connections[i] = connection
+		ai = AsyncRemoteAI(connection, gameid)
+		await ai.connect(me, walls, locations)
+		return ai
+	
+	async def close(self):
+		for connection in self.connections:
+			if connection:
+				await connection.close()
+		self.connections = [None]*len(self.connections)
+
+# Event loop running in a background thread, shared by every MuxRemoteAI
+_loop = None
+_loopthread = None
+_looplock = threading.Lock()
+# Shared MuxPool for each (host, port)
+_pools = {}
+
+def _getLoop():
+	global _loop, _loopthread
+	with _looplock:
+		if _loop is None:
+			_loop = asyncio.new_event_loop()
+			_loopthread = threading.Thread(target=_loop.run_forever, name="asyncremoteai", daemon=True)
+			_loopthread.start()
+			atexit.register(_shutdown)
+	return _loop
+
+def _shutdown():
+	"""
+	Closes every pool's connections and stops the event loop. Registered with atexit.
+	"""
+	async def closePools():
+		for pool in list(_pools.values()):
+			await pool.close()
+		_pools.clear()
+	try:
+		asyncio.run_coroutine_threadsafe(closePools(), _loop).result(1)
+	except Exception:
+		pass
+	_loop.call_soon_threadsafe(_loop.stop)
+	_loopthread.join(1)
+	if not _loop.is_running():
+		_loop.close()
+
+class MuxRemoteAI:
+	"""
+	Blocking wrapper around AsyncRemoteAI with the same interface as RemoteAI.
+	Every MuxRemoteAI for the same server shares one MuxPool.
+	"""
+	error = RemoteAI.error
+	
+	def __init__(self, host, port=PORT, timeout=9.5):
+		"""
+		host, port: Address of the AI server
+		timeout: Seconds to wait for a reply before giving up
+		"""
+		self.host = host
+		self.port = port
+		self.timeout = timeout
+		self.ai = None
+	
+	def _run(self, coro):
+		future = asyncio.run_coroutine_threadsafe(coro, _getLoop())
+		try:
+			return future.result(self.timeout)
+		except concurrent.futures.TimeoutError:
+			future.cancel()
+			raise RemoteAI.error("Timed out waiting for the server")
+	
+	def connect(self, me, walls, locations):
+		pool = _pools.get((self.host, self.port))
+		if pool is None:
+			pool = _pools[self.host, self.port] = MuxPool(self.host, port=self.port)
+		try:
+			self.ai = self._run(pool.newGame(me, walls, locations))
+		except (OSError, RemoteAI.error):
+			return False
+		# Registered after _getLoop registers _shutdown, so the game is ended before the pool is closed
+		atexit.register(self.close)
+		return True
+	
+	def sendMove(self, move):
+		_getLoop().call_soon_threadsafe(self.ai.sendMove, move)
+	
+	def sendInvalidate(self, plyid):
+		_getLoop().call_soon_threadsafe(self.ai.sendInvalidate, plyid)
+	
+	def getMove(self):
+		return self._run(self.ai.getMove())
+	
+	def getAdjacent(self, r,c):
+		return self._run(self.ai.getAdjacent(r,c))
+	
+	def getPath(self, r1,c1, r2,c2):
+		return self._run(self.ai.getPath(r1,c1, r2,c2))
+	
+	def close(self):
+		"""
+		Ends the game on the server. The connection stays open for the other games.
+		"""
+		if self.ai:
+			try:
+				self._run(self.ai.close())
+			except RemoteAI.error:
+				pass
+			self.ai = None
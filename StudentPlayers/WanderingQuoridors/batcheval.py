@@ -0,0 +1,85 @@
+"""
+Scores many leaf positions at once with NumPy, for alphabeta.
+The distances for every wall layout and goal are found with one flood out of the goals for all of them,
+and the scores are computed from the distances the same way Board.evaluate does.
+Importing this module raises ImportError if NumPy isn't installed.
+
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+import numpy
+from Model.interface import BOARD_DIM
+from .batchwalls import edgeMasks, spread, _GOALS
+
+# Fewer wall layouts than this are quicker to score one position at a time, since
+# Board.evaluate finds the distances of positions that only moved a pawn in its cache
+MIN_LAYOUTS = 8
+
+def distances(leaves, goals):
+	"""
+	Finds the distance from each player to their goal in many positions.
+		leaves: (wallmask, locations) of each position. locations has each player's (r,c) location by id.
+		goals: Ids of the players to find the distances of
+	Returns a (len(leaves), len(goals)) array of the distances, with -1 where there is no path
+	"""
+	layouts = {}
+	for wallmask, locations in leaves:
+		layouts.setdefault(wallmask, len(layouts))
+	right, down = edgeMasks(list(layouts))
+	
+	# One board for each goal of each layout, starting out with just the goal reached
+	ngoals = len(goals)
+	right = numpy.repeat(right, ngoals, axis=0)
+	down = numpy.repeat(down, ngoals, axis=0)
+	reach = numpy.tile(_GOALS[goals], (len(layouts), 1))
+	
+	# The space each distance is asked for, as its board, row and column bit
+	boards, rows, bits = [], [], []
+	for wallmask, locations in leaves:
+		base = layouts[wallmask]*ngoals
+		for i, plyid in enumerate(goals):
+			boards.append(base+i)
+			rows.append(locations[plyid][0])
+			bits.append(1 << locations[plyid][1])
+	bits = numpy.array(bits, dtype=numpy.uint16)
+	
+	dist = numpy.full(len(bits), -1)
+	dist[reach[boards, rows] & bits != 0] = 0
+	layer = 0
+	while (dist < 0).any():
+		new = spread(reach, right, down)
+		if (new == reach).all():
+			break
+		layer += 1
+		dist[(new[boards, rows] & bits != 0) & (dist < 0)] = layer
+		reach = new
+	return dist.reshape(len(leaves), ngoals)
+
+def evaluateLeaves(leaves, plyid):
+	"""
+	Scores many positions like Board.evaluate.
+		leaves: (wallmask, locations) of each position. locations has each player's (r,c) location by id,
+		        or None for invalidated players. Every position must have the same players left,
+		        none of them on their goal.
+		plyid: Player to score the positions for
+	Returns a list of the scores
+	"""
+	players = leaves[0][1]
+	goals = [i for i, loc in enumerate(players) if loc is not None]
+	dist = distances(leaves, goals).astype(float)
+	assert (dist > 0).all()
+	
+	# Same operations in the same order as Board.evaluate, so the scores are exactly the same
+	myscore = 0
+	enemyscore = 0
+	for i, p in enumerate(goals):
+		if p == plyid:
+			myscore = -dist[:, i]
+		else:
+			enemyscore = enemyscore + -20/numpy.sqrt(dist[:, i])
+	
+	if len(players) > 1:
+		enemyscore = enemyscore / (len(players)-1)
+	
+	return (enemyscore + myscore).tolist()
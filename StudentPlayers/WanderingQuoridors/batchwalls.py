@@ -0,0 +1,96 @@
+"""
+Checks many wall slots of a board at once with NumPy, for Board.legalSlots.
+Each candidate wall gets its own copy of the board's edges with the wall added, and all of them
+are flooded from the players' locations together.
+A board is stored as one 16 bit integer per row, with bit c standing for column c.
+Importing this module raises ImportError if NumPy isn't installed.
+
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+import numpy
+from Model.interface import BOARD_DIM
+from .wall import WALL_SLOTS, NUM_SLOTS
+
+# Edges of an empty board, and the edges cut by the wall in each slot.
+#   right[r] bit c: the edge between (r,c) and (r,c+1)
+#   down[r] bit c: the edge between (r,c) and (r+1,c)
+_ALL_RIGHT = numpy.full(BOARD_DIM, (1 << (BOARD_DIM-1))-1, dtype=numpy.uint16)
+_ALL_DOWN = numpy.full(BOARD_DIM-1, (1 << BOARD_DIM)-1, dtype=numpy.uint16)
+_SLOT_RIGHT = numpy.zeros((NUM_SLOTS, BOARD_DIM), dtype=numpy.uint16)
+_SLOT_DOWN = numpy.zeros((NUM_SLOTS, BOARD_DIM-1), dtype=numpy.uint16)
+for _slot, (_r1, _c1, _r2, _c2) in enumerate(WALL_SLOTS):
+	if _r1 == _r2:
+		_SLOT_DOWN[_slot, _r1-1] = 3 << _c1
+	else:
+		_SLOT_RIGHT[_slot, _r1:_r1+2] = 1 << (_c1-1)
+
+# Goal spaces of each of the four goals, in the same order as board._goal_settings
+_GOALS = numpy.zeros((4, BOARD_DIM), dtype=numpy.uint16)
+_GOALS[0, 0] = (1 << BOARD_DIM)-1
+_GOALS[1, BOARD_DIM-1] = (1 << BOARD_DIM)-1
+_GOALS[2, :] = 1 << (BOARD_DIM-1)
+_GOALS[3, :] = 1
+
+def edgeMasks(wallmasks):
+	"""
+	Returns the (right, down) open edges of boards with each of wallmasks placed, stacked like _SLOT_RIGHT and _SLOT_DOWN
+	"""
+	data = b"".join(wallmask.to_bytes(NUM_SLOTS//8, "little") for wallmask in wallmasks)
+	# unpackbits puts each byte's high bit first. Reverse the bits of each byte to get slot order, since
+	# unpackbits only takes bitorder="little" from NumPy 1.17.
+	placed = numpy.unpackbits(numpy.frombuffer(data, dtype=numpy.uint8).reshape(len(wallmasks), -1, 1), axis=2)
+	placed = placed[:, :, ::-1].reshape(len(wallmasks), NUM_SLOTS)
+	right = _ALL_RIGHT & ~numpy.bitwise_or.reduce(placed[:, :, None] * _SLOT_RIGHT, axis=1)
+	down = _ALL_DOWN & ~numpy.bitwise_or.reduce(placed[:, :, None] * _SLOT_DOWN, axis=1)
+	return right, down
+
+def spread(reach, right, down):
+	"""
+	Returns a stack of reachable-space masks grown by one step through each board's open edges
+	"""
+	new = reach | (reach & right) << 1 | (reach >> 1) & right
+	new[:, 1:] |= reach[:, :-1] & down
+	new[:, :-1] |= reach[:, 1:] & down
+	return new
+
+def _flood(reach, right, down, goals):
+	"""
+	Grows a stack of reachable-space masks one step at a time through each board's open edges,
+	until every board has reached its goal or none of them grow any more.
+		reach: (N, BOARD_DIM) starting spaces
+		right, down: Open edges of each board, shaped like _SLOT_RIGHT and _SLOT_DOWN
+		goals: (N, BOARD_DIM) goal spaces
+	Returns a bool array of which boards reached their goal
+	"""
+	while True:
+		new = spread(reach, right, down)
+		reached = (new & goals).any(axis=1)
+		if reached.all() or (new == reach).all():
+			return reached
+		reach = new
+
+def searchSlots(board, searches):
+	"""
+	Checks a batch of walls that cut a player's current shortest path.
+		board: Board the walls would be placed on
+		searches: (slot, player) pairs, one for each player cut by each wall
+	Returns a bitmask of the slots that leave every player they cut a path to their goal
+	"""
+	right, down = edgeMasks([board.wallmask])
+	
+	slots = numpy.array([slot for slot, ply in searches])
+	reach = numpy.zeros((len(searches), BOARD_DIM), dtype=numpy.uint16)
+	reach[numpy.arange(len(searches)), [ply.location[0] for slot, ply in searches]] = \
+		[1 << ply.location[1] for slot, ply in searches]
+	goals = _GOALS[[ply.id for slot, ply in searches]]
+	reached = _flood(reach, right & ~_SLOT_RIGHT[slots], down & ~_SLOT_DOWN[slots], goals)
+	
+	legal = 0
+	cutoff = 0
+	for (slot, ply), ok in zip(searches, reached):
+		legal |= 1 << slot
+		if not ok:
+			cutoff |= 1 << slot
+	return legal & ~cutoff
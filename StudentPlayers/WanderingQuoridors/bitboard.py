@@ -0,0 +1,352 @@
+"""
+Compact board representation using integer bitmasks
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+from .board import Board, Player, _ZOBRIST_SLOT, _ZOBRIST_WALLS, _cacheGet, _cachePut
+from .wall import WALL_SLOTS, WALL_CONFLICTS
+from Model.interface import BOARD_DIM
+from collections import OrderedDict
+
+# Cells are numbered r*BOARD_DIM+c. The open edges of the graph are stored in two masks:
+#   right: bit i is set if a pawn can move between cell i and cell i+1
+#   down:  bit i is set if a pawn can move between cell i and cell i+BOARD_DIM
+# Copying a board only copies a few integers, and reachability is computed by flooding
+# whole BFS layers at a time with shifts.
+
+_ALL_RIGHT = 0
+_ALL_DOWN = 0
+for _r in range(BOARD_DIM):
+	for _c in range(BOARD_DIM):
+		if _c != BOARD_DIM-1: _ALL_RIGHT |= 1 << (_r*BOARD_DIM+_c)
+		if _r != BOARD_DIM-1: _ALL_DOWN  |= 1 << (_r*BOARD_DIM+_c)
+
+# Goal masks for each of the four goal rows, in the same order as board._goal_settings
+_GOAL_MASKS = [0, 0, 0, 0]
+for _i in range(BOARD_DIM):
+	_GOAL_MASKS[0] |= 1 << (_i)
+	_GOAL_MASKS[1] |= 1 << ((BOARD_DIM-1)*BOARD_DIM+_i)
+	_GOAL_MASKS[2] |= 1 << (_i*BOARD_DIM+BOARD_DIM-1)
+	_GOAL_MASKS[3] |= 1 << (_i*BOARD_DIM)
+
+# Edges of the right and down masks cut by a wall in each slot
+_CUT_RIGHT = []
+_CUT_DOWN = []
+for _r1, _c1, _r2, _c2 in WALL_SLOTS:
+	if _r1 == _r2:
+		_CUT_RIGHT.append(0)
+		_CUT_DOWN.append(3 << ((_r1-1)*BOARD_DIM+_c1))
+	else:
+		_CUT_RIGHT.append((1 | 1 << BOARD_DIM) << (_r1*BOARD_DIM+_c1-1))
+		_CUT_DOWN.append(0)
+
+def _adjacent(i, right, down):
+	"""
+	Returns a mask of the cells adjacent to cell i
+	"""
+	bit = 1 << i
+	return ((bit & right) << 1) | ((bit >> 1) & right) | ((bit & down) << BOARD_DIM) | ((bit >> BOARD_DIM) & down)
+
+def _flood(start, goalmask, right, down):
+	"""
+	Flood-fills from cell start one BFS layer at a time.
+	Returns the list of layers, the last of which intersects goalmask, or None if no goal is reachable.
+	"""
+	seen = frontier = 1 << start
+	layers = []
+	while frontier:
+		layers.append(frontier)
+		if frontier & goalmask:
+			return layers
+		frontier = (((frontier & right) << 1) | ((frontier >> 1) & right) | \
+			((frontier & down) << BOARD_DIM) | ((frontier >> BOARD_DIM) & down)) & ~seen
+		seen |= frontier
+	return None
+
+def _distance(start, goalmask, right, down):
+	"""
+	Returns the length of the shortest path from cell start to any cell in goalmask,
+	or None if no goal is reachable.
+	"""
+	seen = frontier = 1 << start
+	dist = 0
+	while frontier:
+		if frontier & goalmask:
+			return dist
+		frontier = (((frontier & right) << 1) | ((frontier >> 1) & right) | \
+			((frontier & down) << BOARD_DIM) | ((frontier >> BOARD_DIM) & down)) & ~seen
+		seen |= frontier
+		dist += 1
+	return None
+
+def _layers(startmask, right, down):
+	"""
+	Flood-fills the whole board from the cells in startmask.
+	Returns the list of BFS layers; layer i holds the cells i moves away from startmask.
+	"""
+	seen = frontier = startmask
+	layers = []
+	while frontier:
+		layers.append(frontier)
+		frontier = (((frontier & right) << 1) | ((frontier >> 1) & right) | \
+			((frontier & down) << BOARD_DIM) | ((frontier >> BOARD_DIM) & down)) & ~seen
+		seen |= frontier
+	return layers
+
+# LRU cache of the BFS layers out of each goal, keyed by (wallmask, goalnum). Storing whole layers
+# instead of a per-space field makes a cache miss about as cheap as a single search.
+_distancelayers = OrderedDict()
+
+def _cells(mask):
+	"""
+	Iterates over the (r,c) locations of the cells set in mask
+	"""
+	while mask:
+		low = mask & -mask
+		yield divmod(low.bit_length()-1, BOARD_DIM)
+		mask ^= low
+
+class BitBoard(Board):
+	"""
+	Representation of a quoridor board, using bitmasks for the board graph and placed walls.
+	Has the same public interface as Board.
+	"""
+	
+	# Searching the bitmasks one wall at a time is quicker than NumPy
+	BATCH_SEARCHES = None
+	
+	def __init__(self, players):
+		self.players = players
+		self.walls = []
+		self.pathblockers = [None]*len(players)
+		self.activeplayers = 0
+		for i in players:
+			if i:
+				self.activeplayers += 1
+		
+		self.right = _ALL_RIGHT
+		self.down = _ALL_DOWN
+		self.blocked = 0
+		self.wallmask = 0
+		self.zobrist = self._computeZobrist()
+		self.undolog = []
+	
+	def _occupied(self):
+		"""
+		Returns a mask of the cells that have a player on them
+		"""
+		mask = 0
+		for p in self.players:
+			if p:
+				mask |= 1 << (p.location[0]*BOARD_DIM+p.location[1])
+		return mask
+	
+	def getAdjacent(self, loc):
+		"""
+		Returns the spaces that can be accessed from this space, ignoring players
+			loc: (r,c) location
+		"""
+		return list(_cells(_adjacent(loc[0]*BOARD_DIM+loc[1], self.right, self.down)))
+	
+	def getAdjacentHop(self, loc):
+		"""
+		Iterates over all adjacent spaces that can be accessed from this space,
+		also computing moves where players can hop over each other
+			loc: (r,c) location
+		"""
+		right, down = self.right, self.down
+		occupied = self._occupied()
+		i = loc[0]*BOARD_DIM+loc[1]
+		adj = _adjacent(i, right, down)
+		while adj:
+			low = adj & -adj
+			adj ^= low
+			j = low.bit_length()-1
+			if occupied & low:
+				k = 2*j-i
+				adj2 = _adjacent(j, right, down)
+				if k >= 0 and adj2 >> k & 1 and not occupied >> k & 1:
+					yield divmod(k, BOARD_DIM)
+				else:
+					# Sideways around the pawn, onto spaces nobody is standing on
+					adj2 &= ~occupied
+					if k >= 0:
+						adj2 &= ~(1 << k)
+					yield from _cells(adj2)
+			else:
+				yield divmod(j, BOARD_DIM)
+	
+	def checkSlot(self, slot):
+		"""
+		Checks if a wall can be placed in a slot, without needing a Wall object.
+		Does checks 2 and 3 of checkWall.
+		"""
+		if self.blocked >> slot & 1:
+			# Intersects with a placed wall
+			return False
+		
+		# Only players whose current shortest path is cut by the wall need to be searched again
+		cut = self.getPlayersCutBy(slot)
+		if not cut:
+			return True
+		
+		right = self.right & ~_CUT_RIGHT[slot]
+		down = self.down & ~_CUT_DOWN[slot]
+		for ply in cut:
+			if _distance(ply.location[0]*BOARD_DIM+ply.location[1], _GOAL_MASKS[ply.id], right, down) is None:
+				return False
+		return True
+	
+	def copy(self):
+		"""
+		Creates a copy of the board.
+		"""
+		new = BitBoard.__new__(BitBoard) # Create a new object without calling __init__
+		
+		new.right = self.right
+		new.down = self.down
+		new.blocked = self.blocked
+		new.wallmask = self.wallmask
+		new.zobrist = self.zobrist
+		new.undolog = []
+		new.walls = self.walls.copy() # Walls and players are immutable, so they don't need to be deep copied
+		new.players = self.players.copy()
+		new.pathblockers = self.pathblockers.copy()
+		new.activeplayers = self.activeplayers
+		
+		return new
+	
+	def addWall(self, wall, onlytoboard=False):
+		"""
+		Adds a wall to the internal board representation. Assumes the wall is valid and can be added
+		
+		onlytoboard is an internal parameter and should not be used.
+		"""
+		slot = wall.slot()
+		self.right &= ~_CUT_RIGHT[slot]
+		self.down &= ~_CUT_DOWN[slot]
+		
+		if not onlytoboard:
+			self.blocked |= WALL_CONFLICTS[slot]
+			self.wallmask |= 1 << slot
+			for i, blockers in enumerate(self.pathblockers):
+				if blockers is not None and blockers >> slot & 1:
+					self.pathblockers[i] = None
+			self.walls.append(wall)
+			self.zobrist ^= _ZOBRIST_SLOT[slot]
+			ply = self.players[wall.owner]
+			if ply:
+				self.zobrist ^= _ZOBRIST_WALLS[ply.id][ply.walls] ^ _ZOBRIST_WALLS[ply.id][ply.walls-1]
+				self.players[ply.id] = Player(ply.id, ply.location, ply.walls-1)
+	
+	def _saveWallState(self, move):
+		"""
+		Returns the parts of the board that placing the wall in move will change, for pop
+		"""
+		return self.right, self.down, self.blocked, self.wallmask
+	
+	def _restoreWallState(self, state):
+		"""
+		Restores the state returned by _saveWallState
+		"""
+		self.right, self.down, self.blocked, self.wallmask = state
+	
+	#################################################################################################################
+	
+	def canReach(self, loc, atgoal):
+		"""
+		Returns True if it is possible to reach a location where atgoal(location) == True
+		"""
+		return self._bfs(loc, atgoal) is not None
+	
+	def canReachGoal(self, loc, plyid):
+		"""
+		Returns True if it is possible to reach player plyid's goal.
+		"""
+		return _distance(loc[0]*BOARD_DIM+loc[1], _GOAL_MASKS[plyid], self.right, self.down) is not None
+	
+	def _pathTo(self, start, goalmask):
+		"""
+		Finds the shortest path from start to any cell in goalmask.
+		Returns a list of (r,c) tuples representing the path, or None if no path exists
+		"""
+		right, down = self.right, self.down
+		layers = _flood(start[0]*BOARD_DIM+start[1], goalmask, right, down)
+		if layers is None:
+			return None
+		
+		# Walk back through the layers, picking any neighbor from the previous one each step
+		current = layers[-1] & goalmask
+		current &= -current
+		l = [current]
+		for layer in reversed(layers[:-1]):
+			i = current.bit_length()-1
+			current = _adjacent(i, right, down) & layer
+			current &= -current
+			l.append(current)
+		l.reverse()
+		return [divmod(bit.bit_length()-1, BOARD_DIM) for bit in l]
+	
+	def _bfs(self, start, atgoal):
+		"""
+		Generic BFS Algorithm
+			start: Starting point
+			atgoal: function that takes a location and returns true if that location is a destination
+		Returns a list of (r,c) tuples representing the path, or None if no path exists
+		"""
+		goalmask = 0
+		for r in range(BOARD_DIM):
+			for c in range(BOARD_DIM):
+				if atgoal((r,c)):
+					goalmask |= 1 << (r*BOARD_DIM+c)
+		return self._pathTo(start, goalmask)
+	
+	def findPathToLoc(self, start, dest):
+		"""
+		Finds the shortest valid path from start to dest, inclusive.
+		Returns:
+			a list of (r,c) tuples representing the path.
+		"""
+		return self._pathTo(start, 1 << (dest[0]*BOARD_DIM+dest[1]))
+	
+	def findPathToGoal(self, start, goalnum):
+		"""
+		Finds the shortest valid path to the goal
+		"""
+		return self._pathTo(start, _GOAL_MASKS[goalnum])
+	
+	def distanceToGoal(self, start, goalnum):
+		"""
+		Returns the number of moves in the shortest valid path to the goal, or None if there is no path
+		"""
+		bit = 1 << (start[0]*BOARD_DIM+start[1])
+		for dist, layer in enumerate(self.getDistanceLayers(goalnum)):
+			if layer & bit:
+				return dist
+		return None
+	
+	def getDistanceLayers(self, goalnum):
+		"""
+		Returns the list of BFS layers out of the goal; layer i is a mask of the spaces i moves away from it.
+		The layers are cached by wall configuration and should not be modified.
+		"""
+		key = (self.wallmask, goalnum)
+		layers = _cacheGet(_distancelayers, key)
+		if layers is None:
+			layers = _layers(_GOAL_MASKS[goalnum], self.right, self.down)
+			_cachePut(_distancelayers, key, layers)
+		return layers
+	
+	def _distanceField(self, goalnum):
+		"""
+		Computes the distance field for a goal from its BFS layers.
+		Spaces that cannot reach the goal have a distance of None.
+		"""
+		field = [None]*(BOARD_DIM*BOARD_DIM)
+		for dist, mask in enumerate(self.getDistanceLayers(goalnum)):
+			while mask:
+				low = mask & -mask
+				field[low.bit_length()-1] = dist
+				mask ^= low
+		return field
@@ -4,11 +4,25 @@ Author: Alex Parrill (amp9612@rit.edu)
 Author: Joseph Moreyn (jbm6331@rit.edu)
 """
 
-from .wall import Wall
-from .hashableplayermove import HashablePlayerMove
+from .wall import getWall, wallSlot, WALL_CONFLICTS, SLOT_DIM, VERT_SLOT_OFFSET, NUM_SLOTS
+from .moves import PAWN_MOVES, WALL_MOVES
 from Model.interface import BOARD_DIM
-from collections import deque
+from collections import OrderedDict
 from math import sqrt
+from array import array
+import random
+import threading
+
+# Board.legalSlots searches many walls at once with NumPy if it is installed, or one at a time otherwise
+try:
+	from . import batchwalls
+except ImportError:
+	batchwalls = None
+
+# Number of distance fields to keep in the cache
+DISTANCE_CACHE_SIZE = 4096
+
+ALL_SLOTS = (1 << NUM_SLOTS)-1
 
 # Heuristic and isgoal functions for each of the four goal rows
 _goal_settings = [
@@ -19,47 +33,236 @@ _goal_settings = [
 	(lambda loc: abs(loc[1]), lambda loc: loc[1] == 0)
 ]
 
+def _pathBlockers(path):
+	"""
+	Returns a bitmask of the wall slots that would cut an edge of path.
+	Any wall not in this set leaves the path intact.
+	"""
+	blockers = 0
+	for i in range(len(path)-1):
+		(r1,c1), (r2,c2) = path[i], path[i+1]
+		if c1 == c2:
+			# Cut by the horizontal walls at row max(r1,r2) covering column c1
+			slot = (max(r1, r2)-1)*SLOT_DIM + c1
+			if c1 != 0:        blockers |= 1 << (slot-1)
+			if c1 != SLOT_DIM: blockers |= 1 << slot
+		else:
+			# Cut by the vertical walls at column max(c1,c2) covering row r1
+			slot = VERT_SLOT_OFFSET + r1*SLOT_DIM + max(c1, c2)-1
+			if r1 != 0:        blockers |= 1 << (slot-SLOT_DIM)
+			if r1 != SLOT_DIM: blockers |= 1 << slot
+	return blockers
+
+# Order generateNext tries wall slots in: vertical walls, then horizontal walls
+WALL_SCAN_ORDER = [wallSlot(r, c, r+2, c) for c in range(1, BOARD_DIM) for r in range(0, BOARD_DIM-1)] + \
+	[wallSlot(r, c, r, c+2) for r in range(1, BOARD_DIM) for c in range(0, BOARD_DIM-1)]
+
+# Zobrist keys. A board's hash is the XOR of the keys for each player's location and remaining walls,
+# and for each occupied wall slot. ZOBRIST_TURN can be mixed in to tell apart the player to move.
+_zobrist_random = random.Random(51894)
+def _zobristKeys(n):
+	return [_zobrist_random.getrandbits(64) for i in range(n)]
+_ZOBRIST_LOCATION = [_zobristKeys(BOARD_DIM*BOARD_DIM) for i in range(4)]
+_ZOBRIST_WALLS = [_zobristKeys(64) for i in range(4)]
+_ZOBRIST_SLOT = _zobristKeys(NUM_SLOTS)
+ZOBRIST_TURN = _zobristKeys(4)
+
+def _zobristPlayer(ply):
+	"""
+	Returns the Zobrist key for a player's location and remaining walls
+	"""
+	return _ZOBRIST_LOCATION[ply.id][ply.location[0]*BOARD_DIM+ply.location[1]] ^ _ZOBRIST_WALLS[ply.id][ply.walls]
+
+# LRU cache of distance fields, keyed by (wallmask, goalnum). Pawn moves don't change the walls,
+# so the fields can be shared between every board with the same walls placed.
+_distancefields = OrderedDict()
+
+# The server runs games on several threads, and they all share the caches, so the caches are only used under this lock
+_cachelock = threading.Lock()
+
+def _cacheGet(cache, key):
+	"""
+	Returns the value in an LRU cache of distances for key and marks it as the most recently used, or None if there isn't one
+	"""
+	with _cachelock:
+		value = cache.get(key)
+		if value is not None:
+			cache.move_to_end(key)
+		return value
+
+def _cachePut(cache, key, value):
+	"""
+	Adds a value to an LRU cache of distances, evicting the least recently used one if it is full
+	"""
+	with _cachelock:
+		cache[key] = value
+		if len(cache) > DISTANCE_CACHE_SIZE:
+			cache.popitem(last=False)
+
+# Searches on cell indices. Cells are numbered r*BOARD_DIM+c, and instead of reading the board's
+# adjacency dict, an edge is open if none of the wall slots that cut it are in the board's wallmask.
+
+NUM_CELLS = BOARD_DIM*BOARD_DIM
+
+# (r,c) location of each cell
+_LOCATIONS = [divmod(_i, BOARD_DIM) for _i in range(NUM_CELLS)]
+
+# Neighbors of each cell, as (cell, mask of the wall slots that cut the edge to it) pairs
+_EDGES = []
+for _r in range(BOARD_DIM):
+	for _c in range(BOARD_DIM):
+		_EDGES.append(tuple((_r2*BOARD_DIM+_c2, _pathBlockers([(_r,_c), (_r2,_c2)]))
+			for _r2, _c2 in ((_r-1,_c), (_r+1,_c), (_r,_c-1), (_r,_c+1))
+			if 0 <= _r2 < BOARD_DIM and 0 <= _c2 < BOARD_DIM))
+
+# For each of the four goals, a bytearray with a 1 for every cell on the goal row or column
+_GOAL_CELLS = [bytearray(map(atgoal, _LOCATIONS)) for heuristic, atgoal in _goal_settings]
+
+_NO_PARENT = array("b", [-1])*NUM_CELLS
+
+# Parent table and queue reused by every search, one set per thread since the server runs games on several.
+# The other state shared between threads is the distance caches, which _cacheGet and _cachePut lock,
+# and the server's transposition tables.
+# A cell's parent is -1 until it is visited, and the start is its own parent.
+_scratch = threading.local()
+
+def _buffers():
+	try:
+		return _scratch.parent, _scratch.queue
+	except AttributeError:
+		_scratch.parent = array("b", _NO_PARENT)
+		_scratch.queue = array("b", _NO_PARENT)
+		return _scratch.parent, _scratch.queue
+
+def _search(start, goalcells, wallmask):
+	"""
+	BFS from cell start to the nearest cell set in goalcells, through the edges not cut by wallmask.
+	Returns the goal cell found, or -1 if none can be reached. The path can then be read with _path.
+	"""
+	parent, queue = _buffers()
+	parent[:] = _NO_PARENT
+	parent[start] = start
+	if goalcells[start]:
+		return start
+	queue[0] = start
+	head, tail = 0, 1
+	while head < tail:
+		i = queue[head]
+		head += 1
+		for j, cut in _EDGES[i]:
+			if parent[j] < 0 and not wallmask & cut:
+				parent[j] = i
+				# Cells are checked as they are found rather than when they are expanded, so the search
+				# stops without going through the rest of the last layer
+				if goalcells[j]:
+					return j
+				queue[tail] = j
+				tail += 1
+	return -1
+
+def _path(end):
+	"""
+	Returns the path found by the last _search on this thread, from its start to end, as a list of (r,c) tuples
+	"""
+	parent, queue = _buffers()
+	l = [divmod(end, BOARD_DIM)]
+	while parent[end] != end:
+		end = parent[end]
+		l.append(divmod(end, BOARD_DIM))
+	l.reverse()
+	return l
+
+def _distances(goalcells, wallmask):
+	"""
+	BFS from every cell set in goalcells at once, through the edges not cut by wallmask.
+	Returns a list of the distance from each cell to the nearest goal cell, or None if it can't reach one.
+	"""
+	field = [None]*NUM_CELLS
+	parent, queue = _buffers()
+	tail = 0
+	for i in range(NUM_CELLS):
+		if goalcells[i]:
+			field[i] = 0
+			queue[tail] = i
+			tail += 1
+	head = 0
+	while head < tail:
+		i = queue[head]
+		head += 1
+		dist = field[i]+1
+		for j, cut in _EDGES[i]:
+			if field[j] is None and not wallmask & cut:
+				field[j] = dist
+				queue[tail] = j
+				tail += 1
+	return field
+
 class Player:
 	"""
-	Player object.
+	Player object. Players are immutable; boards replace them with new ones when they move or place a wall,
+	so copies of a board can share them.
 	"""
+	__slots__ = ("id", "location", "walls")
+	
 	def __init__(self, id, location, walls):
 		"""
 		id: Base-zero Player id
 		location: Current location of player
 		walls: Number of walls the player has left
 		"""
-		self.id = id
-		self.location = location
-		self.walls = walls
+		_set = object.__setattr__
+		_set(self, "id", id)
+		_set(self, "location", location)
+		_set(self, "walls", walls)
+	
+	def __setattr__(self, name, value):
+		raise AttributeError("Player is immutable")
+	__delattr__ = __setattr__
+	
+	def __reduce__(self):
+		return (Player, (self.id, self.location, self.walls))
 	
 	def copy(self):
 		"""
-		Creates a copy of self
+		Returns self, since players are immutable
 		"""
-		return Player(self.id, self.location, self.walls)
+		return self
 	
 	def __str__(self):
 		return "Player({0},{1},{2})".format(self.id, self.location, self.walls)
 	__repr__ = __str__
 	
 	def __eq__(self, other):
+		if not isinstance(other, Player):
+			return NotImplemented
 		return self.id == other.id and self.location == other.location and self.walls == other.walls
 	def __hash__(self):
-		return hash(self.id) ^ hash(self.location) ^ hash(self.walls)
+		return hash((self.id, self.location, self.walls))
 
 class Board:
 	"""
 	Representation of a quoridor board
 	"""
 	
+	# Smallest number of searches legalSlots hands to NumPy. With fewer, NumPy's overhead per call
+	# costs more than searching one at a time. None never uses NumPy.
+	BATCH_SEARCHES = 16
+	
 	def __init__(self, players, board=None, walls=None):
 		self.players = players
 		self.walls = walls or []
+		self.blocked = 0
+		self.wallmask = 0
+		for w in self.walls:
+			self.blocked |= WALL_CONFLICTS[w.slot()]
+			self.wallmask |= 1 << w.slot()
+		self.pathblockers = [None]*len(players)
 		self.activeplayers = 0
 		for i in players:
 			if i:
 				self.activeplayers += 1
+		self.zobrist = self._computeZobrist()
+		self.undolog = []
 		
 		if board:
 			self.board = board
@@ -75,6 +278,25 @@ class Board:
 					self.board[r,c] = frozenset(tmplist)
 					tmplist.clear()
 	
+	def _computeZobrist(self):
+		"""
+		Computes the Zobrist hash of the board from scratch
+		"""
+		h = 0
+		for p in self.players:
+			if p:
+				h ^= _zobristPlayer(p)
+		for w in self.walls:
+			h ^= _ZOBRIST_SLOT[w.slot()]
+		return h
+	
+	def getAdjacent(self, loc):
+		"""
+		Returns the spaces that can be accessed from this space, ignoring players
+			loc: (r,c) location
+		"""
+		return self.board[loc]
+	
 	def getAdjacentHop(self, loc):
 		"""
 		Iterates over all adjacent spaces that can be accessed from this space,
@@ -88,7 +310,8 @@ class Board:
 					yield loc3
 				else:
 					for loc4 in self.board[loc2].difference((loc, loc3)):
-						yield loc4
+						if not self.getPlayerAt(loc4):
+							yield loc4
 			else:
 				yield loc2
 	
@@ -104,27 +327,79 @@ class Board:
 		2. It does not intersect with any other walls
 		3. It does not cut off a player's path
 		"""
-		if not wall.isValid():
+		return wall.isValid() and self.checkSlot(wall.slot())
+	
+	def checkSlot(self, slot):
+		"""
+		Checks if a wall can be placed in a slot, without needing a Wall object.
+		Does checks 2 and 3 of checkWall.
+		"""
+		if self.blocked >> slot & 1:
+			# Intersects with a placed wall
 			return False
 		
-		for i in self.walls:
-			if wall.intersects(i):
-				return False
+		# Only players whose current shortest path is cut by the wall need to be searched again
+		cut = self.getPlayersCutBy(slot)
+		if not cut:
+			return True
 		
-		# Temporairly 'add' the wall and make sure players can still get to their goals
-		board = self.board
-		try:
-			self.board = self.board.copy()
-			self.addWall(wall, True)
-			for ply in self.players:
-				if ply and self.findPathToGoal(ply.location, ply.id) == None: #not self.canReachGoal(ply.location, ply.id):
-					return False
-		finally:
-			# Make sure we put it back
-			self.board = board
+		# Search again as if the wall was placed, and make sure players can still get to their goals
+		wallmask = self.wallmask | 1 << slot
+		for ply in cut:
+			if _search(ply.location[0]*BOARD_DIM+ply.location[1], _GOAL_CELLS[ply.id], wallmask) < 0:
+				return False
 		
 		return True
 	
+	def legalSlots(self):
+		"""
+		Returns a bitmask of the slots a wall can be placed in, like calling checkSlot on each slot.
+		"""
+		free = ALL_SLOTS & ~self.blocked
+		players = [p for p in self.players if p]
+		blockers = [self.getPathBlockers(p.id) for p in players]
+		
+		# Walls that don't cut anyone's current shortest path can't cut anyone off
+		cutsany = 0
+		for mask in blockers:
+			cutsany |= mask
+		legal = free & ~cutsany
+		
+		# The others need a search for each player they cut
+		cutslots = free & cutsany
+		if batchwalls is not None and self.BATCH_SEARCHES is not None and \
+				sum(bin(mask & cutslots).count("1") for mask in blockers) >= self.BATCH_SEARCHES:
+			searches = []
+			for slot in range(NUM_SLOTS):
+				if cutslots >> slot & 1:
+					for ply, mask in zip(players, blockers):
+						if mask >> slot & 1:
+							searches.append((slot, ply))
+			return legal | batchwalls.searchSlots(self, searches)
+		for slot in range(NUM_SLOTS):
+			if cutslots >> slot & 1 and self.checkSlot(slot):
+				legal |= 1 << slot
+		return legal
+	
+	def getPathBlockers(self, plyid):
+		"""
+		Returns a bitmask of the wall slots that would cut player plyid's current shortest path to its goal.
+		The result is cached until the player moves or a wall cuts that path.
+		"""
+		blockers = self.pathblockers[plyid]
+		if blockers is None:
+			ply = self.players[plyid]
+			blockers = _pathBlockers(self.findPathToGoal(ply.location, ply.id))
+			self.pathblockers[plyid] = blockers
+		return blockers
+	
+	def getPlayersCutBy(self, slot):
+		"""
+		Returns the list of players whose current shortest path would be cut by a wall in slot.
+		Placing a wall can only make paths longer, so every other player still has a path.
+		"""
+		return [ply for ply in self.players if ply and self.getPathBlockers(ply.id) >> slot & 1]
+	
 	def copy(self):
 		"""
 		Creates a copy of the player data.
@@ -133,13 +408,18 @@ class Board:
 		
 		# Copy over attributes
 		new.board = self.board.copy() # The individual elements in the adjacency list are immutable, so they dont need to be deep copied
-		new.walls = self.walls.copy() # Wall are immutable, so they don't need to be deep copied
-		new.players = [p and p.copy() or p for p in self.players]
+		new.walls = self.walls.copy() # Walls and players are immutable, so they don't need to be deep copied
+		new.blocked = self.blocked
+		new.wallmask = self.wallmask
+		new.zobrist = self.zobrist
+		new.players = self.players.copy()
+		new.pathblockers = self.pathblockers.copy()
+		new.undolog = []
 		
 		return new
 	
 	def __hash__(self):
-		return hash(self.walls) ^ hash(self.players)
+		return self.zobrist
 	
 	#################################################################################################################
 	
@@ -150,17 +430,67 @@ class Board:
 		if move.move:
 			self.updatePlayerLocation(move.playerId-1, (move.r2, move.c2))
 		else:
-			w = Wall(move.playerId-1, move.r1, move.c1, move.r2, move.c2)
+			w = getWall(move.playerId-1, move.r1, move.c1, move.r2, move.c2)
 			assert(self.checkWall(w))
 			self.addWall(w)
 		return self
-		
+	
+	def push(self, move):
+		"""
+		Applies the passed PlayerMove object in place, like applyMove, and remembers how to undo it.
+		Each push must be matched with a pop.
+		"""
+		plyid = move.playerId-1
+		if move.move:
+			self.undolog.append((plyid, self.players[plyid], None, self.pathblockers[plyid], self.zobrist))
+		else:
+			self.undolog.append((plyid, self.players[plyid], self._saveWallState(move), self.pathblockers.copy(), self.zobrist))
+		return self.applyMove(move)
+	
+	def pop(self):
+		"""
+		Undoes the last move applied with push.
+		"""
+		plyid, ply, wallstate, pathblockers, zobrist = self.undolog.pop()
+		self.players[plyid] = ply
+		if wallstate is None:
+			self.pathblockers[plyid] = pathblockers
+		else:
+			self._restoreWallState(wallstate)
+			self.walls.pop()
+			self.pathblockers = pathblockers
+		self.zobrist = zobrist
+		return self
+	
+	def _saveWallState(self, move):
+		"""
+		Returns the parts of the board that placing the wall in move will change, for pop
+		"""
+		r1, c1 = move.r1, move.c1
+		if move.r1 == move.r2:
+			cells = ((r1,c1), (r1,c1+1), (r1-1,c1), (r1-1,c1+1))
+		else:
+			cells = ((r1,c1), (r1+1,c1), (r1,c1-1), (r1+1,c1-1))
+		return self.blocked, self.wallmask, [(loc, self.board[loc]) for loc in cells]
+	
+	def _restoreWallState(self, state):
+		"""
+		Restores the state returned by _saveWallState
+		"""
+		self.blocked, self.wallmask, cells = state
+		for loc, adj in cells:
+			self.board[loc] = adj
+	
 	def updatePlayerLocation(self, plyid, loc):
 		"""
 		updatePlayerLocation: int, (r,c)
 		Updates a player's location.
 		"""
-		self.players[plyid].location = loc
+		ply = self.players[plyid]
+		self.zobrist ^= _ZOBRIST_LOCATION[plyid][ply.location[0]*BOARD_DIM+ply.location[1]] ^ \
+			_ZOBRIST_LOCATION[plyid][loc[0]*BOARD_DIM+loc[1]]
+		self.players[plyid] = Player(plyid, loc, ply.walls)
+		self.pathblockers[plyid] = None
 	
 	def addWall(self, wall, onlytoboard=False):
 		"""
@@ -168,7 +498,7 @@ class Board:
 		
 		onlytoboard is an internal parameter and should not be used.
 		"""
-
+		
 		if wall.isHoriz():
 			# Horizontal wall
 			self.board[wall.r1  ,wall.c1  ] = self.board[wall.r1  ,wall.c1  ].difference(((wall.r1-1,wall.c1  ),))
@@ -183,16 +513,38 @@ class Board:
 			self.board[wall.r1+1,wall.c1-1] = self.board[wall.r1+1,wall.c1-1].difference(((wall.r1+1,wall.c1  ),))
 		
 		if not onlytoboard:
+			slot = wall.slot()
+			self.blocked |= WALL_CONFLICTS[slot]
+			self.wallmask |= 1 << slot
+			for i, blockers in enumerate(self.pathblockers):
+				if blockers is not None and blockers >> slot & 1:
+					self.pathblockers[i] = None
 			self.walls.append(wall)
+			self.zobrist ^= _ZOBRIST_SLOT[slot]
 			ply = self.players[wall.owner]
 			if ply:
-				ply.walls -= 1
+				self.zobrist ^= _ZOBRIST_WALLS[ply.id][ply.walls] ^ _ZOBRIST_WALLS[ply.id][ply.walls-1]
+				self.players[ply.id] = Player(ply.id, ply.location, ply.walls-1)
 	
 	def invalidate(self, plyid):
+		ply = self.players[plyid]
+		if ply:
+			self.zobrist ^= _zobristPlayer(ply)
+			self.activeplayers -= 1
 		self.players[plyid] = None
+		self.pathblockers[plyid] = None
 	
 	#################################################################################################################
 	
+	def nextPlayer(self, plyid):
+		"""
+		Returns the id of the player whose turn comes after plyid's
+		"""
+		nextid = (plyid+1) % len(self.players)
+		while not self.players[nextid]:
+			nextid = (nextid+1) % len(self.players)
+		return nextid
+	
 	def isTerminal(self):
 		"""
 		If a player is on one of the goal spaces, returns that player.
@@ -212,7 +564,7 @@ class Board:
 		enemyscore = 0
 		for p in self.players:
 			if p:
-				s = len(self.findPathToGoal(p.location, p.id))-1
+				s = self.distanceToGoal(p.location, p.id)
 				assert s != 0
 				if p.id == plyid:
 					myscore = -s
@@ -227,34 +579,29 @@ class Board:
 	def generateNext(self, plyid):
 		"""
 		Returns a generator that yields every possible (Hashable)PlayerMove from this configuration by
-		player plyid
+		player plyid. The moves are the shared ones from moves.py.
 		"""
 		ply = self.players[plyid]
+		loc1 = ply.location
+		pawnmoves = PAWN_MOVES[plyid]
+		start = (loc1[0]*BOARD_DIM+loc1[1])*NUM_CELLS
 		
 		# Movement
 		canmove = False
-		for loc in self.getAdjacentHop(ply.location):
+		for loc in self.getAdjacentHop(loc1):
 			canmove = True
-			yield HashablePlayerMove(ply.id+1, True, ply.location[0], ply.location[1], loc[0], loc[1])
+			yield pawnmoves[start + loc[0]*BOARD_DIM+loc[1]]
 		
 		if ply.walls != 0:
-			# Vertical walls
-			for c in range(1, BOARD_DIM):
-				for r in range(0, BOARD_DIM-1):
-					w = Wall(ply.id, r, c, r+2, c)
-					if self.checkWall(w):
-						canmove = True
-						yield w.toMove()
-			# Horizontal walls
-			for r in range(1, BOARD_DIM):
-				for c in range(0, BOARD_DIM-1):
-					w = Wall(ply.id, r, c, r, c+2)
-					if self.checkWall(w):
-						canmove = True
-						yield w.toMove()
-
+			wallmoves = WALL_MOVES[plyid]
+			legal = self.legalSlots()
+			for slot in WALL_SCAN_ORDER:
+				if legal >> slot & 1:
+					canmove = True
+					yield wallmoves[slot]
+		
 		if not canmove:
-			yield HashablePlayerMove(ply.id+1, True, ply.location[0], ply.location[1], ply.location[0], ply.location[1])
+			yield pawnmoves[start + loc1[0]*BOARD_DIM+loc1[1]]
 	
 	def generateNextMove(self, plyid):
 		"""
@@ -262,15 +609,17 @@ class Board:
 		
 		Returns a pass HashablePlayerMove if the player cannot move.
 		"""
-		ply = self.players[plyid]
+		loc1 = self.players[plyid].location
+		pawnmoves = PAWN_MOVES[plyid]
+		start = (loc1[0]*BOARD_DIM+loc1[1])*NUM_CELLS
 		
 		# Movement
 		canmove = False
-		for loc in self.getAdjacentHop(ply.location):
+		for loc in self.getAdjacentHop(loc1):
 			canmove = True
-			yield HashablePlayerMove(ply.id+1, True, ply.location[0], ply.location[1], loc[0], loc[1])
+			yield pawnmoves[start + loc[0]*BOARD_DIM+loc[1]]
 		if not canmove:
-			yield HashablePlayerMove(ply.id+1, True, ply.location[0], ply.location[1], ply.location[0], ply.location[1])
+			yield pawnmoves[start + loc1[0]*BOARD_DIM+loc1[1]]
 	
 	#################################################################################################################
 	
@@ -278,25 +627,23 @@ class Board:
 		"""
 		Returns True if it is possible to reach a location where atgoal(location) == True
 		"""
-		visited = set()
-		stack = [loc]
-		while stack:
-			i = stack.pop()
-			if i in visited:
-				continue
-			if atgoal(i):
-				return True
-			visited.add(i)
-			for j in self.board[i]:
-				stack.append(j)
-		return False
+		return self._bfs(loc, atgoal) is not None
 	
 	def canReachGoal(self, loc, plyid):
 		"""
 		Returns True if it is possible to reach player plyid's goal.
 		"""
-		heuristic, atgoal = _goal_settings[plyid]
-		return self.canReach(loc, atgoal)
+		return _search(loc[0]*BOARD_DIM+loc[1], _GOAL_CELLS[plyid], self.wallmask) >= 0
+	
+	def _pathTo(self, start, goalcells):
+		"""
+		Finds the shortest path from start to any cell set in the goalcells bytearray.
+		Returns a list of (r,c) tuples representing the path, or None if no path exists
+		"""
+		end = _search(start[0]*BOARD_DIM+start[1], goalcells, self.wallmask)
+		if end < 0:
+			return None
+		return _path(end)
 	
 	def _bfs(self, start, atgoal):
 		"""
@@ -305,40 +652,46 @@ class Board:
 			atgoal: function that takes a location and returns true if that location is a destination
 		Returns a list of (r,c) tuples representing the path, or None if no path exists
 		"""
-		queue = deque()
-		queue.append(start)
-		closed = {start : None}
-		
-		while queue:
-			current = queue.popleft()
-			if atgoal(current):
-				l = []
-				while current != None:
-					l.append(current)
-					current = closed[current]
-				l.reverse()
-				return l
-			for i in self.board[current]:
-				if i not in closed:
-					closed[i] = current
-					queue.append(i)
-		return None
-		
+		goalcells = bytearray(map(atgoal, _LOCATIONS))
+		return self._pathTo(start, goalcells)
+	
 	def findPathToLoc(self, start, dest):
 		"""
 		Finds the shortest valid path from start to dest, inclusive.
 		Returns:
 			a list of (r,c) tuples representing the path.
 		"""
-		#def heuristic(loc):
-		#	return abs(dest[0]-loc[0]) + abs(dest[1]-loc[1])
-		def atgoal(loc):
-			return loc == dest
-		return self._bfs(start, atgoal)
+		goalcells = bytearray(NUM_CELLS)
+		goalcells[dest[0]*BOARD_DIM+dest[1]] = 1
+		return self._pathTo(start, goalcells)
 	
 	def findPathToGoal(self, start, goalnum):
 		"""
 		Finds the shortest valid path to the goal
 		"""
-		heuristic, atgoal = _goal_settings[goalnum]
-		return self._bfs(start, atgoal)
+		return self._pathTo(start, _GOAL_CELLS[goalnum])
+	
+	def distanceToGoal(self, start, goalnum):
+		"""
+		Returns the number of moves in the shortest valid path to the goal, or None if there is no path
+		"""
+		return self.getDistanceField(goalnum)[start[0]*BOARD_DIM+start[1]]
+	
+	def getDistanceField(self, goalnum):
+		"""
+		Returns a list with the distance from every space, indexed by r*BOARD_DIM+c, to the goal.
+		The fields are cached by wall configuration and should not be modified.
+		"""
+		key = (self.wallmask, goalnum)
+		field = _cacheGet(_distancefields, key)
+		if field is None:
+			field = self._distanceField(goalnum)
+			_cachePut(_distancefields, key, field)
+		return field
+	
+	def _distanceField(self, goalnum):
+		"""
+		Computes the distance field for a goal with a BFS starting from every goal space at once.
+		Spaces that cannot reach the goal have a distance of None.
+		"""
+		return _distances(_GOAL_CELLS[goalnum], self.wallmask)
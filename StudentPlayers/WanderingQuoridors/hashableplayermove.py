@@ -7,16 +7,33 @@ Author: Joseph Moreyn (jbm6331@rit.edu)
 
 from Model.interface import PlayerMove
 
+def moveId(playerId, move, r1, c1, r2, c2):
+	"""
+	Returns the integer that identifies a move. Moves with every coordinate between 0 and 15 never share an id,
+	which covers every move on the board.
+	"""
+	return (((((playerId << 1 | move) << 4 | r1) << 4 | c1) << 4 | r2) << 4) | c2
+
 class HashablePlayerMove(PlayerMove):
 	"""
-	Subclass of PlayerMove that is hashable
+	Subclass of PlayerMove that is hashable.
+	id is computed once from the fields by moveId, and is used as the hash.
+	The search uses the shared instances in moves.py instead of making new ones, so they must not be modified.
 	"""
-	__slots__ = tuple()
+	__slots__ = ("id",)
+	
+	def __init__(self, playerId, move, r1, c1, r2, c2):
+		PlayerMove.__init__(self, playerId, move, r1, c1, r2, c2)
+		self.id = moveId(playerId, move, r1, c1, r2, c2)
 	
 	def __eq__(self, other):
+		if isinstance(other, HashablePlayerMove) and self.id != other.id:
+			return False
+		if not isinstance(other, PlayerMove):
+			return NotImplemented
 		return self.playerId == other.playerId and \
 			self.move == other.move and \
 			self.r1 == other.r1 and self.r2 == other.r2 and \
 			self.c1 == other.c1 and self.c2 == other.c2
 	def __hash__(self):
-		return hash(self.playerId) ^ hash(self.move) ^ hash(self.r1) ^ hash(self.c1) ^ hash(self.r2) ^ hash(self.c2)
+		return self.id
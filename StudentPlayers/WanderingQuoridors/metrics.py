@@ -0,0 +1,139 @@
+"""
+Optional instrumentation of the search and board code.
+enable() replaces the instrumented functions with counting wrappers, so until it is called
+nothing is counted and the search runs the original functions with no overhead.
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+import json
+from . import board, bitboard, transposition, ordering, playerData
+
+try:
+	from . import batcheval
+except ImportError:
+	batcheval = None
+
+# Counters, added to by the wrappers
+#   nodes: alphabeta calls
+#   evaluations: Leaf nodes evaluated
+#   cutoffs: Beta cutoffs
+#   ttprobes, tthits: Transposition table lookups, and how many found an entry
+#   fieldlookups, fieldmisses: Distance field cache lookups, and how many had to compute the field
+#   bfs: Breadth first searches and flood fills run on a board
+COUNTERS = ("nodes", "evaluations", "cutoffs", "ttprobes", "tthits", "fieldlookups", "fieldmisses", "bfs")
+counters = dict((name, 0) for name in COUNTERS)
+
+enabled = False
+
+def _counting(func, *names):
+	def wrapper(*args, **kwargs):
+		for name in names:
+			counters[name] += 1
+		return func(*args, **kwargs)
+	wrapper.__wrapped__ = func
+	return wrapper
+
+def _countingTableGet(func):
+	def wrapper(self, key):
+		entry = func(self, key)
+		counters["ttprobes"] += 1
+		if entry is not None:
+			counters["tthits"] += 1
+		return entry
+	wrapper.__wrapped__ = func
+	return wrapper
+
+def _countingResults(func, name):
+	"""
+	Counts each result of a batch function that returns a list or dict of them, or None
+	"""
+	def wrapper(*args, **kwargs):
+		results = func(*args, **kwargs)
+		if results is not None:
+			counters[name] += len(results)
+		return results
+	wrapper.__wrapped__ = func
+	return wrapper
+
+# (namespace, attribute, wrapper factory) of everything enable() instruments
+_INSTRUMENTED = [
+	(playerData, "alphabeta", lambda f: _counting(f, "nodes")),
+	(board.Board, "evaluate", lambda f: _counting(f, "evaluations")),
+	(ordering.MoveOrderer, "cutoff", lambda f: _counting(f, "cutoffs")),
+	(transposition.TranspositionTable, "get", _countingTableGet),
+	(board.Board, "getDistanceField", lambda f: _counting(f, "fieldlookups")),
+	(board.Board, "_distanceField", lambda f: _counting(f, "fieldmisses", "bfs")),
+	(board, "_search", lambda f: _counting(f, "bfs")),
+	(bitboard.BitBoard, "getDistanceLayers", lambda f: _counting(f, "fieldlookups")),
+	(bitboard, "_layers", lambda f: _counting(f, "fieldmisses", "bfs")),
+	(bitboard, "_flood", lambda f: _counting(f, "bfs")),
+	(bitboard, "_distance", lambda f: _counting(f, "bfs")),
+	# Leaves scored together are nodes alphabeta didn't call itself for
+	(playerData, "scoreLeaves", lambda f: _countingResults(f, "nodes")),
+]
+if batcheval is not None:
+	_INSTRUMENTED.append((batcheval, "evaluateLeaves", lambda f: _countingResults(f, "evaluations")))
+
+def enable():
+	"""
+	Installs the counting wrappers
+	"""
+	global enabled
+	if enabled:
+		return
+	for namespace, name, wrap in _INSTRUMENTED:
+		setattr(namespace, name, wrap(namespace.__dict__[name]))
+	enabled = True
+
+def disable():
+	"""
+	Puts the original functions back
+	"""
+	global enabled
+	if not enabled:
+		return
+	for namespace, name, wrap in _INSTRUMENTED:
+		setattr(namespace, name, namespace.__dict__[name].__wrapped__)
+	enabled = False
+
+def snapshot():
+	"""
+	Returns a copy of the counters, to pass to report later
+	"""
+	return dict(counters)
+
+def _ratio(a, b):
+	return a / b if b else 0.0
+
+def report(before, seconds, extra=None, logger=None, filename=None):
+	"""
+	Computes the statistics of the counts made since before was taken.
+		before: Result of snapshot() taken at the start
+		seconds: Wall clock time taken
+		extra: Dict of other values to include, such as the search depth
+		logger: If not None, writes a one line summary to it
+		filename: If not None, appends the statistics to this JSON lines file
+	Returns:
+		Dict of the statistics
+	"""
+	stats = dict((name, counters[name] - before[name]) for name in COUNTERS)
+	expanded = stats["nodes"] - stats["evaluations"]
+	stats["seconds"] = seconds
+	stats["nps"] = _ratio(stats["nodes"], seconds)
+	# Children searched per node that wasn't a leaf. The roots of the searches are nobody's children,
+	# which the depth count stands in for.
+	stats["branching"] = _ratio(stats["nodes"] - (extra or {}).get("depth", 0), expanded)
+	stats["cutoffrate"] = _ratio(stats["cutoffs"], expanded)
+	stats["tthitrate"] = _ratio(stats["tthits"], stats["ttprobes"])
+	stats["fieldhitrate"] = 1 - _ratio(stats["fieldmisses"], stats["fieldlookups"])
+	if extra:
+		stats.update(extra)
+	
+	if logger is not None:
+		logger.write("{seconds:.2f}s, {nodes} nodes ({nps:.0f}/s), branching {branching:.1f}, cutoffs {cutoffrate:.0%}, "
+			"TT hits {tthitrate:.0%}, distance cache hits {fieldhitrate:.0%}, {bfs} BFS".format(**stats))
+	if filename is not None:
+		with open(filename, "a") as f:
+			f.write(json.dumps(stats) + "\n")
+	return stats
@@ -0,0 +1,36 @@
+"""
+Shared HashablePlayerMove instances for every move a player can make, made once when the module is loaded.
+Generating moves looks them up instead of creating new ones, so they must not be modified;
+use getCopy to get a PlayerMove to hand to the engine.
+
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+from Model.interface import BOARD_DIM
+from .hashableplayermove import HashablePlayerMove
+from .wall import WALL_SLOTS
+
+MAX_PLAYERS = 4
+NUM_CELLS = BOARD_DIM*BOARD_DIM
+
+# Wall placements of each player, indexed by slot
+WALL_MOVES = [[HashablePlayerMove(plyid+1, False, *coords) for coords in WALL_SLOTS] for plyid in range(MAX_PLAYERS)]
+
+# Pawn moves of each player, indexed by start cell*NUM_CELLS + end cell, where a cell is r*BOARD_DIM+c.
+# Every end at most two steps away has one, which covers hops; passing ends on the start cell.
+PAWN_MOVES = [[None]*(NUM_CELLS*NUM_CELLS) for plyid in range(MAX_PLAYERS)]
+for _plyid in range(MAX_PLAYERS):
+	for _r1 in range(BOARD_DIM):
+		for _c1 in range(BOARD_DIM):
+			for _r2 in range(max(_r1-2, 0), min(_r1+3, BOARD_DIM)):
+				for _c2 in range(max(_c1-2, 0), min(_c1+3, BOARD_DIM)):
+					if abs(_r2-_r1) + abs(_c2-_c1) <= 2:
+						PAWN_MOVES[_plyid][(_r1*BOARD_DIM+_c1)*NUM_CELLS + _r2*BOARD_DIM+_c2] = \
+							HashablePlayerMove(_plyid+1, True, _r1, _c1, _r2, _c2)
+
+def pawnMove(plyid, loc1, loc2):
+	"""
+	Returns the shared move of player plyid's pawn from loc1 to loc2
+	"""
+	return PAWN_MOVES[plyid][(loc1[0]*BOARD_DIM+loc1[1])*NUM_CELLS + loc2[0]*BOARD_DIM+loc2[1]]
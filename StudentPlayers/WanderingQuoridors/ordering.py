@@ -0,0 +1,131 @@
+"""
+Move ordering for the alphabeta search
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+from .wall import wallSlot
+from .board import WALL_SCAN_ORDER
+from .moves import pawnMove, WALL_MOVES
+
+# Number of killer moves remembered for each depth
+NUM_KILLERS = 2
+
+class MoveOrderer:
+	"""
+	Generates moves so that the ones most likely to cause a cutoff are searched first:
+	1. The best move stored in the transposition table
+	2. Pawn steps along the player's shortest path
+	3. Killer moves: moves that caused a cutoff at the same depth in another branch
+	4. Walls that cut an opponent's current shortest path, best history score first
+	5. The other pawn steps, then every other wall
+	Moves are generated lazily in that order, so a cutoff early on skips checking most of the walls.
+	Killers and history scores are kept between searches. History scores and the moves already generated
+	are keyed by move id, and the moves are the shared ones from moves.py.
+	"""
+	
+	def __init__(self):
+		self.killers = {}
+		self.history = {}
+	
+	def order(self, board, plyid, depth, ttmove=None, walls=True):
+		"""
+		Returns a generator that yields every possible (Hashable)PlayerMove by player plyid,
+		in the order they should be searched.
+			board: Board the moves are made on
+			plyid: Player making the moves
+			depth: Remaining search depth
+			ttmove: Best move from the transposition table, if any
+			walls: If False, only generate pawn movements, like Board.generateNextMove
+		"""
+		ply = board.players[plyid]
+		loc = ply.location
+		done = set()
+		
+		if ttmove is not None:
+			done.add(ttmove.id)
+			yield ttmove
+		
+		# Pawn steps, split by whether they get closer to the goal
+		curdist = board.distanceToGoal(loc, plyid)
+		pathsteps, othersteps = [], []
+		for loc2 in board.getAdjacentHop(loc):
+			move = pawnMove(plyid, loc, loc2)
+			if board.distanceToGoal(loc2, plyid) < curdist:
+				pathsteps.append(move)
+			else:
+				othersteps.append(move)
+		
+		for move in pathsteps:
+			if move.id not in done:
+				done.add(move.id)
+				yield move
+		
+		walls = walls and ply.walls != 0
+		for move in self.killers.get(depth, ()):
+			if move.id in done or move.playerId != plyid+1:
+				continue
+			if move.move:
+				if move not in othersteps:
+					continue
+			elif not walls or not board.checkSlot(wallSlot(move.r1, move.c1, move.r2, move.c2)):
+				continue
+			done.add(move.id)
+			yield move
+		
+		history = self.history
+		wallmoves = WALL_MOVES[plyid]
+		opponentpaths = 0
+		if walls:
+			for p in board.players:
+				if p and p.id != plyid:
+					opponentpaths |= board.getPathBlockers(p.id)
+			opponentpaths &= ~board.blocked
+			
+			pathwalls = [slot for slot in WALL_SCAN_ORDER if opponentpaths >> slot & 1]
+			pathwalls.sort(key=lambda slot: -history.get(wallmoves[slot].id, 0))
+			for slot in pathwalls:
+				move = wallmoves[slot]
+				if move.id not in done and board.checkSlot(slot):
+					done.add(move.id)
+					yield move
+		
+		othersteps.sort(key=lambda move: -history.get(move.id, 0))
+		for move in othersteps:
+			if move.id not in done:
+				done.add(move.id)
+				yield move
+		
+		if walls:
+			for slot in WALL_SCAN_ORDER:
+				if not opponentpaths >> slot & 1 and board.checkSlot(slot):
+					move = wallmoves[slot]
+					if move.id not in done:
+						done.add(move.id)
+						yield move
+		
+		if not done:
+			# No possible moves, so pass
+			yield pawnMove(plyid, loc, loc)
+	
+	def cutoff(self, move, depth):
+		"""
+		Records that move caused a cutoff when searched with depth piles remaining
+		"""
+		killers = self.killers.setdefault(depth, [])
+		if move not in killers:
+			killers.insert(0, move)
+			del killers[NUM_KILLERS:]
+		self.history[move.id] = self.history.get(move.id, 0) + depth*depth
+	
+	def age(self):
+		"""
+		Halves every history score, so that results from older searches matter less.
+		Should be called before each new search.
+		"""
+		for moveid in list(self.history):
+			score = self.history[moveid] >> 1
+			if score:
+				self.history[moveid] = score
+			else:
+				del self.history[moveid]
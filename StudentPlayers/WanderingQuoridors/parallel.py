@@ -0,0 +1,140 @@
+"""
+Parallel root search for the local AI
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+from multiprocessing import Pool, Value
+from time import time, perf_counter as getTime
+from .playerData import alphabeta, OutOfTime, DEPTH_LIMIT, BATCH_LEAVES, inf
+from .transposition import TranspositionTable
+from .ordering import MoveOrderer
+
+# The pool is kept between moves, so the worker processes only start once and keep their tables.
+# multiprocessing.Pool is used since it can pass the shared alpha to the workers on every Python 3 version.
+_pool = None
+_poolsize = 0
+_alpha = None
+# Counts root searches, so the workers know when to age their move orderers
+_searches = 0
+
+# Worker process state
+_workertables = {}
+_workerorderers = {}
+# Root search each worker orderer was last aged for
+_workersearches = {}
+
+def _initWorker(alpha):
+	global _alpha
+	_alpha = alpha
+
+def _getPool(workers):
+	"""
+	Returns the shared process pool, (re)creating it if it doesn't have workers processes
+	"""
+	global _pool, _poolsize, _alpha
+	if _pool is None or _poolsize != workers:
+		if _pool is not None:
+			_pool.terminate()
+		_alpha = Value("d", -inf)
+		_pool = Pool(workers, _initWorker, (_alpha,))
+		_poolsize = workers
+	return _pool
+
+def shutdown():
+	"""
+	Stops the worker processes, if they are running
+	"""
+	global _pool, _poolsize
+	if _pool is not None:
+		_pool.terminate()
+		_pool = None
+		_poolsize = 0
+
+def _searchMove(board, move, depth, plyid, cheapmin, deadline, search):
+	"""
+	Runs in a worker process. Searches the position after move to depth piles.
+	search identifies the root search; the worker's move orderer is aged once for each one, like iterativeDeepening does.
+	Alpha is read from the value shared between the workers, and raised if this move beats it.
+	Returns:
+		The score of the move, or None if the deadline passed
+		True if the score is exact, or False if it is only an upper bound because it didn't beat alpha
+	"""
+	if time() >= deadline:
+		# Left over from a search that ran out of time; pool tasks can't be cancelled
+		return None, False
+	finishby = getTime() + (deadline - time())
+	# Tables are only valid for one plyid and cheapmin combination
+	key = (plyid, cheapmin)
+	table = _workertables.get(key)
+	if table is None:
+		table = _workertables[key] = TranspositionTable()
+		_workerorderers[key] = MoveOrderer()
+	orderer = _workerorderers[key]
+	if _workersearches.get(key) != search:
+		_workersearches[key] = search
+		orderer.age()
+	
+	a = _alpha.value
+	nextid = board.nextPlayer(plyid)
+	board.push(move)
+	try:
+		_, score = alphabeta(board, depth-1, plyid, a, inf, nextid, cheapmin, table, finishby, orderer, BATCH_LEAVES)
+	except OutOfTime:
+		return None, False
+	finally:
+		board.pop()
+	
+	with _alpha.get_lock():
+		if score > _alpha.value:
+			_alpha.value = score
+	return score, score > a or a == -inf
+
+def parallelIterativeDeepening(board, plyid, finishby, workers, cheapmin=False, maxdepth=DEPTH_LIMIT):
+	"""
+	Like iterativeDeepening, but splits the moves at the root between workers processes.
+	Each iteration searches the best moves of the last one first, so the workers find a good alpha early.
+		board: Starting configuration
+		plyid: Maxing player's id
+		finishby: getTime() value to stop searching at
+		workers: Number of worker processes
+		cheapmin: See alphabeta
+		maxdepth: Maximum number of piles to search
+	Returns:
+		The best PlayerMove object found by the deepest completed search, or None
+		The score of that move
+		The depth of the last completed search
+	"""
+	global _searches
+	pool = _getPool(workers)
+	_searches += 1
+	# Workers can't compare getTime() values with ours, so send them the wall clock deadline instead
+	deadline = time() + (finishby - getTime())
+	
+	orderer = MoveOrderer()
+	moves = list(orderer.order(board, plyid, 1))
+	if len(moves) == 1:
+		return moves[0], 0, 0
+	
+	bestmove, bestscore, bestdepth = None, -inf, 0
+	for depth in range(1, maxdepth+1):
+		_alpha.value = -inf
+		pending = [pool.apply_async(_searchMove, (board, move, depth, plyid, cheapmin, deadline, _searches)) for move in moves]
+		for result in pending:
+			result.wait(max(0, finishby - getTime()))
+		if not all(result.ready() for result in pending):
+			# The ones still running stop at the deadline by themselves
+			break
+		
+		results = [result.get() for result in pending]
+		if any(score is None for score, _ in results):
+			break
+		
+		# Order by score, with moves that only have an upper bound last. sorted is stable, so ties keep the old order.
+		order = sorted(range(len(moves)), key=lambda i: (not results[i][1], -results[i][0]))
+		moves = [moves[i] for i in order]
+		bestmove, (bestscore, _) = moves[0], results[order[0]]
+		bestdepth = depth
+		if bestscore == inf or bestscore == -inf:
+			break
+	return bestmove, bestscore, bestdepth
@@ -5,15 +5,49 @@ Author: Joseph Moreyn (jbm6331@rit.edu)
 """
 
 from Model.interface import BOARD_DIM, PlayerMove
-from .board import Board, Player
-from .wall import Wall
+from .board import Board, Player, ZOBRIST_TURN
+from .bitboard import BitBoard
+from .wall import Wall, getWall
 from .remoteai import RemoteAI
+from .transposition import TranspositionTable, EXACT, LOWER, UPPER
+from .ordering import MoveOrderer
+from . import metrics
+from itertools import chain
+from time import perf_counter as getTime
 import random
 
+try:
+	from . import batcheval
+except ImportError:
+	batcheval = None
+
 CHEAP_MIN_ON_4PLAYER = True
 
+# Seconds the local AI may spend searching for a move. Leaves some of the engine's 10 second limit spare.
+SEARCH_TIME = 8
+# Iterative deepening depth limit
+DEPTH_LIMIT = 32
+# Number of processes the local AI splits its search between. 0 searches in the engine's process.
+SEARCH_WORKERS = 0
+# Share connections to the AI server between games with asyncremoteai. Only the Python server supports this.
+REMOTE_MUX = False
+# Count nodes, cutoffs, cache hits, etc. for each move the local AI makes, and write them to the logger.
+# Costs nothing when off.
+COLLECT_METRICS = False
+# If not None, the move statistics are also appended to this JSON lines file
+METRICS_FILE = None
+# Score the leaves under nodes one ply above them together, with batcheval, where every leaf would be
+# searched anyway. Needs NumPy.
+BATCH_LEAVES = True
+
+class OutOfTime(Exception):
+	"""
+	Raised by alphabeta when the search runs past its deadline
+	"""
+	pass
+
 inf = float("inf")
-def alphabeta(board, depth, plyid, a=-inf, b=inf, curplyid=None, cheapmin=False):
+def alphabeta(board, depth, plyid, a=-inf, b=inf, curplyid=None, cheapmin=False, table=None, finishby=None, orderer=None, batchleaves=False):
 	"""
 	Generates and runs through a decision tree using minimax and alpha-beta pruning
 	http://en.wikipedia.org/wiki/Minimax and http://en.wikipedia.org/wiki/Alpha-beta_pruning
@@ -24,6 +58,13 @@ def alphabeta(board, depth, plyid, a=-inf, b=inf, curplyid=None, cheapmin=False)
 		b: Recursive parameter, don't use
 		curplyid: Recursive parameter, don't use
 		cheapmin: Only compute pawn movements for min player piles. Tremendously speeds up scan, but doesn't consider enemy wall placements.
+		table: TranspositionTable to look up and store searched positions in. Should only be shared between searches
+		       with the same plyid and cheapmin.
+		finishby: If not None, raises OutOfTime once getTime() passes this time.
+		orderer: MoveOrderer used to sort the moves at each node, and told about cutoffs.
+		batchleaves: At depth 1 nodes whose window rules out a cutoff, generate every move and score the
+		             positions they lead to together with batcheval, if it is available, instead of
+		             searching them one at a time.
 	Returns:
 		The best PlayerMove object found
 		The score of that move
@@ -31,6 +72,9 @@ def alphabeta(board, depth, plyid, a=-inf, b=inf, curplyid=None, cheapmin=False)
 	if curplyid is None:
 		curplyid = plyid
 	
+	if finishby is not None and getTime() > finishby:
+		raise OutOfTime()
+	
 	p = board.isTerminal()
 	if p:
 		if p.id == plyid:
@@ -41,39 +85,151 @@ def alphabeta(board, depth, plyid, a=-inf, b=inf, curplyid=None, cheapmin=False)
 	if depth <= 0:
 		return board, board.evaluate(plyid)
 	
-	nextid = (curplyid+1) % len(board.players)
-	while not board.players[nextid]:
-		nextid = (nextid+1) % len(board.players)
+	ttmove = None
+	if table is not None:
+		key = board.zobrist ^ ZOBRIST_TURN[curplyid]
+		entry = table.get(key)
+		if entry:
+			ttdepth, bound, score, ttmove = entry
+			if ttdepth >= depth and (bound == EXACT or \
+				(bound == LOWER and score >= b) or \
+				(bound == UPPER and score <= a)):
+				return ttmove, score
+		origa, origb = a, b
+	
+	nextid = board.nextPlayer(curplyid)
+	
+	walls = curplyid == plyid or not cheapmin
+	if orderer is not None:
+		itr = orderer.order(board, curplyid, depth, ttmove, walls)
+	else:
+		if walls:
+			itr = board.generateNext(curplyid)
+		else:
+			itr = board.generateNextMove(curplyid)
+		if ttmove:
+			# Search the best move from the last time we saw this position first
+			itr = chain((ttmove,), (move for move in itr if move != ttmove))
+	
+	# Scoring the leaves together means generating and scoring every one of them, so it is only done where
+	# the window rules out a cutoff: max nodes with no upper bound, and min nodes with no lower bound
+	leafscores = None
+	if depth == 1 and batchleaves and batcheval is not None and walls and board.players[curplyid].walls and \
+		(b == inf if curplyid == plyid else a == -inf):
+		itr = list(itr)
+		leafscores = scoreLeaves(board, itr, plyid)
 	
 	if curplyid == plyid:
 		# Max
 		bestmove = None
-		for move in board.generateNext(curplyid):
+		for move in itr:
 			#print("max: examining "+str(move))
-			_, score = alphabeta(board.copy().applyMove(move), depth-1, plyid, a, b, nextid, cheapmin)
+			if leafscores is not None:
+				score = leafscores[move.id]
+			else:
+				board.push(move)
+				try:
+					_, score = alphabeta(board, depth-1, plyid, a, b, nextid, cheapmin, table, finishby, orderer, batchleaves)
+				finally:
+					board.pop()
 			if score > a:
 				bestmove = move
 				a = score
 			if b <= a:
+				if orderer is not None:
+					orderer.cutoff(move, depth)
 				break
+		if table is not None:
+			table.put(key, depth, LOWER if a >= origb else UPPER if bestmove is None else EXACT, a, bestmove)
 		return bestmove, a
 	else:
 		# Min
 		bestmove = None
-		if cheapmin:
-			itr = board.generateNextMove(curplyid)
-		else:
-			itr = board.generateNext(curplyid)
 		for move in itr:
 			#print("min: examining "+str(move))
-			_, score = alphabeta(board.copy().applyMove(move), depth-1, plyid, a, b, nextid, cheapmin)
+			if leafscores is not None:
+				score = leafscores[move.id]
+			else:
+				board.push(move)
+				try:
+					_, score = alphabeta(board, depth-1, plyid, a, b, nextid, cheapmin, table, finishby, orderer, batchleaves)
+				finally:
+					board.pop()
 			if score < b:
 				bestmove = move
 				b = score
 			if b <= a:
+				if orderer is not None:
+					orderer.cutoff(move, depth)
 				break
+		if table is not None:
+			table.put(key, depth, UPPER if b <= origa else LOWER if bestmove is None else EXACT, b, bestmove)
 		return bestmove, b
 
+def scoreLeaves(board, moves, plyid):
+	"""
+	Scores the position after each of moves for plyid, like alphabeta at depth 0, with batcheval.
+	Returns a dict of the scores by move id, or None if there are too few walls among the moves for
+	scoring them together to be worth it.
+	"""
+	if sum(1 for move in moves if not move.move) + 1 < batcheval.MIN_LAYOUTS:
+		return None
+	
+	scores = {}
+	leaves = []
+	leafmoves = []
+	for move in moves:
+		board.push(move)
+		try:
+			p = board.isTerminal()
+			if p:
+				scores[move.id] = inf if p.id == plyid else -inf
+			else:
+				leaves.append((board.wallmask, [ply and ply.location for ply in board.players]))
+				leafmoves.append(move)
+		finally:
+			board.pop()
+	if leaves:
+		for move, score in zip(leafmoves, batcheval.evaluateLeaves(leaves, plyid)):
+			scores[move.id] = score
+	return scores
+
+def iterativeDeepening(board, plyid, finishby, cheapmin=False, table=None, orderer=None, maxdepth=DEPTH_LIMIT):
+	"""
+	Runs alphabeta with increasing depths until finishby passes or maxdepth is searched.
+	The transposition table carries the best moves of each iteration over to the next, so they are searched first.
+		board: Starting configuration
+		plyid: Maxing player's id
+		finishby: getTime() value to stop searching at
+		cheapmin: See alphabeta
+		table: TranspositionTable to use. A temporary one is used if this is None
+		orderer: MoveOrderer to use. A temporary one is used if this is None
+		maxdepth: Maximum number of piles to search
+	Returns:
+		The best PlayerMove object found by the deepest completed search that found one, or None
+		The score of that move
+		The depth of the last completed search
+	"""
+	if table is None:
+		table = TranspositionTable()
+	if orderer is None:
+		orderer = MoveOrderer()
+	orderer.age()
+	
+	bestmove, bestscore, bestdepth = None, -inf, 0
+	for depth in range(1, maxdepth+1):
+		try:
+			move, score = alphabeta(board, depth, plyid, cheapmin=cheapmin, table=table, finishby=finishby, orderer=orderer, batchleaves=BATCH_LEAVES)
+		except OutOfTime:
+			break
+		bestscore, bestdepth = score, depth
+		if move is not None:
+			bestmove = move
+		if score == inf or score == -inf:
+			# The outcome is decided, searching deeper won't change it
+			break
+	return bestmove, bestscore, bestdepth
+
 def randomWall(plyid):
 	"""
 	Generates a random wall, owned by plyid.
@@ -87,7 +243,7 @@ def randomWall(plyid):
 	else:
 		end_r = start_r
 		end_c = start_c + 2
-	return Wall(plyid, start_r, start_c, end_r, end_c)
+	return getWall(plyid, start_r, start_c, end_r, end_c)
 
 def getMoveToGoal(board, plyid):
 	"""
@@ -111,7 +267,7 @@ def getMoveToGoal(board, plyid):
 				return w.toMove()
 	else:
 		# Can pass
-		PlayerMove(plyid+1, True, loc[0], loc[1], loc[0], loc[1])
+		return PlayerMove(plyid+1, True, loc[0], loc[1], loc[0], loc[1])
 
 class PlayerData:
 	"""
@@ -131,10 +287,21 @@ class PlayerData:
 		for i, loc in enumerate(playerLocations):
 			if loc:
 				plys[i] = Player(i, loc, numWalls)
-		self.currentboard = Board(plys)
+		self.currentboard = BitBoard(plys)
 		self.me = playerId
+		self.table = TranspositionTable()
+		self.orderer = MoveOrderer()
+		self.searchtime = SEARCH_TIME
+		self.searchworkers = SEARCH_WORKERS
+		if COLLECT_METRICS:
+			metrics.enable()
 		
-		self.remoteai = RemoteAI("localhost")
+		if REMOTE_MUX:
+			# asyncremoteai needs Python 3.5, so only import it when it's used
+			from .asyncremoteai import MuxRemoteAI
+			self.remoteai = MuxRemoteAI("localhost")
+		else:
+			self.remoteai = RemoteAI("localhost")
 		if not self.remoteai.connect(playerId+1, numWalls, playerLocations):
 			self.logger.write("Unable to connect to AI server, using local AI")
 			self.remoteai = None
@@ -146,6 +313,8 @@ class PlayerData:
 		self.currentboard.applyMove(move)
 		if self.remoteai:
 			self.remoteai.sendMove(move)
+			if self.currentboard.isTerminal():
+				self.close()
 	
 	#from profilehooks import profile
 	#@profile(immediate=True, sort="time", filename="profile.out")
@@ -164,11 +333,22 @@ class PlayerData:
 				self.logger.write("Falling back to local AI")
 				return getMoveToGoal(self.currentboard, self.me)
 		else:
-			depth = 1
+			if metrics.enabled:
+				before = metrics.snapshot()
+				start = getTime()
 			cheapmin = False
-			bestmove, _ = alphabeta(self.currentboard, depth, self.me, cheapmin=cheapmin)
+			finishby = getTime() + self.searchtime
+			if self.searchworkers:
+				# Nodes searched by the worker processes aren't counted in the metrics
+				from .parallel import parallelIterativeDeepening
+				bestmove, score, depth = parallelIterativeDeepening(self.currentboard, self.me, finishby, self.searchworkers, cheapmin=cheapmin)
+			else:
+				bestmove, score, depth = iterativeDeepening(self.currentboard, self.me, finishby, cheapmin=cheapmin, table=self.table, orderer=self.orderer)
+			if metrics.enabled:
+				metrics.report(before, getTime()-start, {"player": self.me+1, "depth": depth, "score": score}, self.logger, METRICS_FILE)
 			if bestmove:
-				return bestmove
+				# The search's moves are shared by every search, so give the engine its own copy
+				return bestmove.getCopy()
 			else:
 				print("WanderingQuoridors: Failure is probably imminent. Panic now.")
 				return getMoveToGoal(self.currentboard, self.me)
@@ -180,3 +360,13 @@ class PlayerData:
 		self.currentboard.invalidate(plyid)
 		if self.remoteai:
 			self.remoteai.sendInvalidate(plyid+1)
+			if plyid == self.me:
+				self.close()
+	
+	def close(self):
+		"""
+		Ends the game on the AI server, once it's over
+		"""
+		if self.remoteai:
+			self.remoteai.close()
+			self.remoteai = None
@@ -0,0 +1,128 @@
+"""
+Compact text format for board positions, so fixed sets of positions can be stored and loaded
+without replaying the moves that led to them.
+
+A position is one line of three space separated fields:
+	tomove: Id (0-3) of the player to move
+	players: Comma separated, in id order. Each is the player's row, column, ':' and walls left,
+	         or '-' for an invalidated player.
+	walls: Comma separated placed walls, or '-' if there are none. Each is the owner's id,
+	       'h' or 'v', and the row and column of the wall's midpoint.
+For example, "1 74:9,04:10 0h15" has the second player to move, with the first player a step
+forward and one of their walls in front of the second player.
+
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+from Model.interface import BOARD_DIM
+from .board import Board, Player
+from .wall import slotWall, wallSlot, WALL_CONFLICTS
+
+def _formatWall(wall):
+	if wall.isHoriz():
+		return "{}h{}{}".format(wall.owner, wall.r1, wall.c1+1)
+	else:
+		return "{}v{}{}".format(wall.owner, wall.r1+1, wall.c1)
+
+def formatPosition(board, tomove):
+	"""
+	Returns the text form of board, with player tomove to move
+	"""
+	players = ",".join("{}{}:{}".format(p.location[0], p.location[1], p.walls) if p else "-" for p in board.players)
+	walls = ",".join(_formatWall(w) for w in board.walls) or "-"
+	return "{} {} {}".format(tomove, players, walls)
+
+def _digit(s, low, high):
+	n = int(s)
+	if n < low or n > high:
+		raise ValueError("{} is outside {}-{}".format(n, low, high))
+	return n
+
+def parsePosition(text):
+	"""
+	Parses the text form of a position.
+	Returns:
+		List of Players, with None for invalidated players
+		List of placed Walls
+		Id of the player to move
+	Raises ValueError if text isn't a valid position.
+	"""
+	try:
+		tomove, players, walls = text.split()
+		tomove = int(tomove)
+		
+		plys = []
+		for i, ply in enumerate(players.split(",")):
+			if ply == "-":
+				plys.append(None)
+				continue
+			loc, count = ply.split(":")
+			if len(loc) != 2:
+				raise ValueError("bad location " + loc)
+			plys.append(Player(i, (_digit(loc[0], 0, BOARD_DIM-1), _digit(loc[1], 0, BOARD_DIM-1)), int(count)))
+		
+		placed = []
+		blocked = 0
+		for wall in walls.split(",") if walls != "-" else ():
+			if len(wall) != 4 or wall[1] not in "hv":
+				raise ValueError("bad wall " + wall)
+			owner = _digit(wall[0], 0, len(plys)-1)
+			r, c = _digit(wall[2], 1, BOARD_DIM-1), _digit(wall[3], 1, BOARD_DIM-1)
+			if wall[1] == "h":
+				slot = wallSlot(r, c-1, r, c+1)
+			else:
+				slot = wallSlot(r-1, c, r+1, c)
+			if blocked >> slot & 1:
+				raise ValueError("wall {} intersects another wall".format(wall))
+			blocked |= WALL_CONFLICTS[slot]
+			placed.append(slotWall(slot, owner))
+	except ValueError as e:
+		raise ValueError("Invalid position {!r}: {}".format(text, e))
+	
+	if len(plys) < 2 or not 0 <= tomove < len(plys) or not plys[tomove]:
+		raise ValueError("Invalid position {!r}: bad players or player to move".format(text))
+	return plys, placed, tomove
+
+def loadPosition(text, cls=Board):
+	"""
+	Creates a board of class cls (Board or BitBoard) from the text form of a position.
+	The walls are assumed to leave every player a path to their goal.
+	Returns:
+		The board
+		Id of the player to move
+	"""
+	players, walls, tomove = parsePosition(text)
+	# addWall takes a wall away from its owner, so give them back first
+	for w in walls:
+		ply = players[w.owner]
+		if ply:
+			players[w.owner] = Player(ply.id, ply.location, ply.walls+1)
+	board = cls(players)
+	for w in walls:
+		board.addWall(w)
+	return board, tomove
+
+def readPositions(filename):
+	"""
+	Returns the text of every position in a file of one position per line.
+	Blank lines and lines starting with '#' are skipped.
+	"""
+	positions = []
+	with open(filename) as f:
+		for line in f:
+			line = line.strip()
+			if line and not line.startswith("#"):
+				positions.append(line)
+	return positions
+
+def writePositions(filename, positions, header=None):
+	"""
+	Writes the text of positions to a file, one per line, after header as '#' comment lines
+	"""
+	with open(filename, "w") as f:
+		if header:
+			for line in header.splitlines():
+				f.write("# " + line + "\n")
+		for text in positions:
+			f.write(text + "\n")
@@ -2,10 +2,85 @@
 import socket
 #import threading
 from .hashableplayermove import HashablePlayerMove
+from contextlib import contextmanager
+import struct
 import atexit
 
 PORT = 51894
 
+# Binary protocol. A client asks for it by sending HELLO_BINARY before the header line, and the server
+# replies with HELLO_BINARY if it supports it. The header and its ack stay text, everything after is binary.
+# Servers without it (WanderingServer) drop the connection, and the client reconnects using text.
+HELLO_BINARY = "hello bin"
+# Requests are an opcode byte followed by a fixed size record
+OP_MOVE, OP_WALL, OP_INVALIDATE, OP_GETMOVE, OP_ADJ, OP_PATH = range(1, 7)
+REQUEST_RECORDS = {
+	OP_MOVE: struct.Struct("BBB"), # player id, r, c
+	OP_WALL: struct.Struct("BBBBB"), # player id, r1, c1, r2, c2
+	OP_INVALIDATE: struct.Struct("B"), # player id
+	OP_GETMOVE: struct.Struct(""),
+	OP_ADJ: struct.Struct("BB"), # r, c
+	OP_PATH: struct.Struct("BBBB"), # r1, c1, r2, c2
+}
+# Reply to OP_MOVE, OP_WALL and OP_INVALIDATE
+BINARY_ACK = 0
+# Reply to OP_GETMOVE
+MOVE_PAWN, MOVE_WALL = 1, 2
+MOVE_REPLY = struct.Struct("BBBBB") # MOVE_PAWN or MOVE_WALL, r1, c1, r2, c2
+# OP_ADJ and OP_PATH reply with a count byte followed by count (r, c) byte pairs
+
+# Multiplexed text protocol, used by asyncremoteai. A client asks for it by sending HELLO_MUX as the first line.
+# Every line after that in both directions starts with a game id, followed by a command or its reply.
+# "new <header>" starts a game, "end" stops it. Failed commands are replied to with "err <message>".
+HELLO_MUX = "hello mux"
+
+def formatHeader(me, walls, locations):
+	"""
+	Returns the text protocol header line for a game
+	"""
+	header = ["{} {}".format(me, walls)]
+	for i in locations:
+		if i:
+			header.append("{},{}".format(i[0], i[1]))
+		else:
+			header.append("inv")
+	return " ".join(header) + "\n"
+
+def formatMove(move):
+	"""
+	Returns the text protocol notification line for a PlayerMove
+	"""
+	if move.move:
+		return "m {} {},{}\n".format(move.playerId, move.r2, move.c2)
+	else:
+		return "w {} {},{} {},{}\n".format(move.playerId, move.r1, move.c1, move.r2, move.c2)
+
+def parseMove(line, me):
+	"""
+	Parses the text protocol reply to g into a HashablePlayerMove made by player me
+	"""
+	try:
+		typ, loc1, loc2 = line.split()
+		r1,c1 = loc1.split(",")
+		r2,c2 = loc2.split(",")
+		if typ == "m":
+			return HashablePlayerMove(me, True, int(r1), int(c1), int(r2), int(c2))
+		elif typ == "w":
+			return HashablePlayerMove(me, False, int(r1), int(c1), int(r2), int(c2))
+	except ValueError:
+		pass
+	raise RemoteAI.error("Invalid data returned from getMove: "+line)
+
+def parseLocs(line):
+	"""
+	Parses a text protocol list of locations into a list of (r,c) tuples
+	"""
+	result = []
+	for i in line.split():
+		r,c = i.split(",")
+		result.append((int(r), int(c)))
+	return result
+
 class RemoteAI:
 	class error(Exception):
 		pass
@@ -13,98 +88,189 @@ class RemoteAI:
 	def __init__(self, host):
 		self.host = host
 		self.socket = None
+		self.reader = None
+		# Acks the server owes us for notifications we haven't waited on yet
+		self.pendingacks = 0
+		# Data queued by batch(), or None if not batching
+		self.sendbuf = None
+		self.binary = False
+	
+	def _send(self, data):
+		if self.sendbuf is not None:
+			self.sendbuf.append(data)
+			return
+		try:
+			self.socket.sendall(data)
+		except OSError as err:
+			raise RemoteAI.error("Disconnected from server: "+str(err))
+	
+	def _sendLine(self, s):
+		self._send(bytes(s,"ascii"))
 	
-	def _send(self, s):
-		b = bytes(s,"ascii")
-		totalsent = 0
-		while totalsent < len(b):
-			sent = self.socket.send(b[totalsent:])
-			if sent == 0:
-				raise RemoteAI.error("Disconnected from server")
-			totalsent = totalsent + sent
+	def _sendRecord(self, op, *args):
+		self._send(bytes((op,)) + REQUEST_RECORDS[op].pack(*args))
 	
 	def _recv(self):
-		buf = bytearray()
-		while True:
-			c = self.socket.recv(1)
-			if c == b'':
-				raise RemoteAI.error("Disconnected from server")
-			if c == b'\n':
-				s = str(buf, "ascii")
-				return s
-			if c != b'\r':
-				buf.append(c[0])
+		try:
+			line = self.reader.readline()
+		except OSError as err:
+			raise RemoteAI.error("Disconnected from server: "+str(err))
+		if not line.endswith(b"\n"):
+			raise RemoteAI.error("Disconnected from server")
+		return str(line, "ascii").rstrip("\r\n")
+	
+	def _recvExact(self, n):
+		try:
+			data = self.reader.read(n)
+		except OSError as err:
+			raise RemoteAI.error("Disconnected from server: "+str(err))
+		if len(data) != n:
+			raise RemoteAI.error("Disconnected from server")
+		return data
+	
+	def _recvLocs(self):
+		count = self._recvExact(1)[0]
+		data = self._recvExact(2*count)
+		return list(zip(data[0::2], data[1::2]))
 	
 	def _recvAck(self):
 		r = self._recv()
 		if r != "ack":
 			raise RemoteAI.error("Received a bad ACK: "+r)
 	
-	def connect(self, me, walls, locations):
+	def _notify(self, s, op, *args):
+		"""
+		Sends a notification without waiting for its ack.
+		Sends the line s in text mode, or the op record in binary mode.
+		"""
+		if self.binary:
+			self._sendRecord(op, *args)
+		else:
+			self._sendLine(s)
+		self.pendingacks += 1
+	
+	def _request(self, s, op, *args):
+		"""
+		Sends a request, then reads the acks of earlier notifications so that its reply can be read next.
+		Sends the line s in text mode, or the op record in binary mode.
+		"""
+		if self.sendbuf is not None:
+			raise RemoteAI.error("Can't make requests while batching")
+		if self.binary:
+			self._sendRecord(op, *args)
+		else:
+			self._sendLine(s)
+		self.sync()
+	
+	def sync(self):
+		"""
+		Waits for the server to acknowledge every notification sent so far.
+		"""
+		if self.binary and self.pendingacks > 0:
+			acks = self._recvExact(self.pendingacks)
+			self.pendingacks = 0
+			if acks.count(BINARY_ACK) != len(acks):
+				raise RemoteAI.error("Received a bad ACK: "+repr(acks))
+		while self.pendingacks > 0:
+			self.pendingacks -= 1
+			self._recvAck()
+	
+	@contextmanager
+	def batch(self):
+		"""
+		Context manager that sends every notification made inside it in one write.
+		"""
+		if self.sendbuf is not None:
+			yield self
+			return
+		self.sendbuf = []
+		try:
+			yield self
+		finally:
+			buf, self.sendbuf = self.sendbuf, None
+			if buf:
+				self._send(b"".join(buf))
+	
+	def _open(self):
+		self.close()
+		self.socket = socket.create_connection((self.host,PORT), timeout=9.5)
+		self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		self.reader = self.socket.makefile("rb")
+		self.pendingacks = 0
+	
+	def _negotiateBinary(self):
+		"""
+		Asks the server to use the binary protocol. Returns False if the server doesn't support it,
+		in which case the connection must be reopened.
+		"""
+		try:
+			self._sendLine(HELLO_BINARY + "\n")
+			return self._recv() == HELLO_BINARY
+		except RemoteAI.error:
+			return False
+	
+	def connect(self, me, walls, locations, binary=True):
+		"""
+		Connects to the server and sends the game setup. Returns False if the server can't be reached.
+		If binary is True, the binary protocol is used if the server supports it.
+		"""
 		try:
-			self.socket = socket.create_connection((self.host,PORT), timeout=9.5)
-			#self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+			self._open()
+			self.binary = False
+			if binary:
+				if self._negotiateBinary():
+					self.binary = True
+				else:
+					self._open()
 			atexit.register(self.close)
 			self.me = me
 			
-			self._send("{} {} ".format(me, walls))
-			for i in locations:
-				if i:
-					self._send("{},{} ".format(i[0], i[1]))
-				else:
-					self._send("inv ")
-			self._send("\n")
+			self._sendLine(formatHeader(me, walls, locations))
 			self._recvAck()
 			return True
-		except OSError:
+		except (OSError, RemoteAI.error):
+			self.close()
 			return False
 	
 	def sendMove(self, move):
 		if move.move:
-			self._send("m {} {},{}\n".format(move.playerId, move.r2, move.c2))
+			self._notify(formatMove(move), OP_MOVE, move.playerId, move.r2, move.c2)
 		else:
-			self._send("w {} {},{} {},{}\n".format(move.playerId, move.r1, move.c1, move.r2, move.c2))
-		self._recvAck()
+			self._notify(formatMove(move), OP_WALL, move.playerId, move.r1, move.c1, move.r2, move.c2)
 	
 	def sendInvalidate(self, plyid):
-		self._send("i {}\n".format(plyid))
-		self._recvAck()
+		self._notify("i {}\n".format(plyid), OP_INVALIDATE, plyid)
 	
 	def getMove(self):
-		self._send("g\n")
+		self._request("g\n", OP_GETMOVE)
+		if self.binary:
+			typ, r1, c1, r2, c2 = MOVE_REPLY.unpack(self._recvExact(MOVE_REPLY.size))
+			if typ != MOVE_PAWN and typ != MOVE_WALL:
+				raise RemoteAI.error("Invalid data returned from getMove: "+str(typ))
+			return HashablePlayerMove(self.me, typ == MOVE_PAWN, r1, c1, r2, c2)
 		
-		typ, loc1, loc2 = self._recv().split()
-		r1,c1 = loc1.split(",")
-		r2,c2 = loc2.split(",")
-		if typ == "m":
-			return HashablePlayerMove(self.me, True, int(r1), int(c1), int(r2), int(c2))
-		elif typ == "w":
-			return HashablePlayerMove(self.me, False, int(r1), int(c1), int(r2), int(c2))
-		else:
-			raise RemoteAI.error("Invalid data returned from getMove: "+str(strresult))
+		return parseMove(self._recv(), self.me)
 	
 	def getAdjacent(self, r,c):
-		self._send("adj {},{}\n".format(r,c))
-		
-		strresult = self._recv().split()
-		result = []
-		for i in strresult:
-			r,c = i.split(",")
-			result.append((int(r), int(c)))
-		return result
+		self._request("adj {},{}\n".format(r,c), OP_ADJ, r, c)
+		if self.binary:
+			return self._recvLocs()
+		return parseLocs(self._recv())
 	
 	def getPath(self, r1,c1, r2,c2):
-		self._send("path {},{} {},{}\n".format(r1,c1, r2,c2))
-		
-		strresult = self._recv().split()
-		result = []
-		for i in strresult:
-			r,c = i.split(",")
-			result.append((int(r), int(c)))
-		return result
+		self._request("path {},{} {},{}\n".format(r1,c1, r2,c2), OP_PATH, r1, c1, r2, c2)
+		if self.binary:
+			return self._recvLocs()
+		return parseLocs(self._recv())
 	
 	def close(self):
+		if self.reader:
+			self.reader.close()
+			self.reader = None
 		if self.socket:
-			self.socket.shutdown(socket.SHUT_RDWR)
+			try:
+				self.socket.shutdown(socket.SHUT_RDWR)
+			except OSError:
+				pass
 			self.socket.close()
 			self.socket = None
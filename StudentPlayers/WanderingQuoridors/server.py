@@ -0,0 +1,357 @@
+"""
+AI server speaking the same protocol as WanderingServer, so RemoteAI can use the Python search
+without LuaJIT. Also supports RemoteAI's binary protocol, and the multiplexed protocol used by asyncremoteai. Run from the directory containing the Model package:
+	python -m StudentPlayers.WanderingQuoridors.server
+The process is long-lived, so the distance caches and transposition tables stay warm across moves and games.
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+import socketserver
+import struct
+import socket
+import argparse
+import threading
+import queue
+from time import perf_counter as getTime
+from .board import Player
+from .bitboard import BitBoard
+from .hashableplayermove import HashablePlayerMove
+from .transposition import TranspositionTable
+from .ordering import MoveOrderer
+from .playerData import iterativeDeepening, getMoveToGoal, SEARCH_TIME
+from .remoteai import PORT, HELLO_BINARY, HELLO_MUX, REQUEST_RECORDS, BINARY_ACK, MOVE_PAWN, MOVE_WALL, MOVE_REPLY, \
+	OP_MOVE, OP_WALL, OP_INVALIDATE, OP_GETMOVE, OP_ADJ, OP_PATH
+
+# Transposition tables shared by every session, keyed by (AI's player id, number of players in the game).
+# The Zobrist key doesn't include the number of players, but evaluate's scores depend on it.
+# Sessions on different threads can use the same table at once without a lock: get reads and put replaces
+# a single slot in one step, and entries are checked against the full Zobrist key, so the worst a race can
+# do is lose an entry.
+_tables = {}
+_tableslock = threading.Lock()
+
+class ProtocolError(Exception):
+	"""
+	Raised when a client sends a line the server doesn't understand
+	"""
+	pass
+
+def parseLoc(s):
+	"""
+	Parses an "r,c" string into a (r,c) tuple
+	"""
+	try:
+		r, c = s.split(",")
+		return int(r), int(c)
+	except ValueError:
+		raise ProtocolError("Invalid location: "+s)
+
+def formatLocs(locs):
+	"""
+	Formats a list of (r,c) tuples as a line of space separated "r,c" strings
+	"""
+	return " ".join("{},{}".format(r, c) for r, c in locs) + "\n"
+
+def packLocs(locs):
+	"""
+	Packs a list of (r,c) tuples into a binary protocol location list
+	"""
+	data = bytearray((len(locs),))
+	for r, c in locs:
+		data.append(r)
+		data.append(c)
+	return bytes(data)
+
+class Session:
+	"""
+	State of one game the server is playing in
+	"""
+	
+	def __init__(self, header, searchtime=SEARCH_TIME):
+		"""
+		header: Connection header line: "me walls loc loc ...", where each loc is "r,c" or "inv"
+		searchtime: Seconds to spend searching for each move
+		"""
+		parts = header.split()
+		if len(parts) < 3:
+			raise ProtocolError("Invalid header: "+header)
+		try:
+			me, walls = int(parts[0]), int(parts[1])
+		except ValueError:
+			raise ProtocolError("Invalid header: "+header)
+		
+		plys = []
+		for i, loc in enumerate(parts[2:]):
+			if loc == "inv":
+				plys.append(None)
+			else:
+				plys.append(Player(i, parseLoc(loc), walls))
+		if not 1 <= me <= len(plys):
+			raise ProtocolError("Invalid header: "+header)
+		
+		self.me = me-1
+		self.board = BitBoard(plys)
+		self.searchtime = searchtime
+		with _tableslock:
+			key = (self.me, len(plys))
+			self.table = _tables.get(key)
+			if self.table is None:
+				self.table = _tables[key] = TranspositionTable()
+		self.orderer = MoveOrderer()
+	
+	def _getPlayer(self, plyid):
+		"""
+		Returns the player with the protocol (1 based) id plyid, which may be a string
+		"""
+		try:
+			ply = self.board.players[int(plyid)-1] if int(plyid) > 0 else None
+		except (ValueError, IndexError):
+			ply = None
+		if not ply:
+			raise ProtocolError("Invalid player: "+str(plyid))
+		return ply
+	
+	def process(self, line):
+		"""
+		Runs one text protocol command line and returns the reply line
+		"""
+		parts = line.split()
+		if not parts:
+			raise ProtocolError("Empty command")
+		cmd, args = parts[0], parts[1:]
+		
+		if cmd == "m" and len(args) == 2:
+			self.notifyMove(args[0], *parseLoc(args[1]))
+			return "ack\n"
+		elif cmd == "w" and len(args) == 3:
+			self.notifyWall(args[0], *(parseLoc(args[1]) + parseLoc(args[2])))
+			return "ack\n"
+		elif cmd == "i" and len(args) == 1:
+			self.notifyInvalidate(args[0])
+			return "ack\n"
+		elif cmd == "g" and not args:
+			move = self.getMove()
+			return "{} {},{} {},{}\n".format("m" if move.move else "w", move.r1, move.c1, move.r2, move.c2)
+		elif cmd == "adj" and len(args) == 1:
+			return formatLocs(self.getAdjacent(*parseLoc(args[0])))
+		elif cmd == "path" and len(args) == 2:
+			return formatLocs(self.getPath(*(parseLoc(args[0]) + parseLoc(args[1]))))
+		else:
+			raise ProtocolError("Unknown command: "+line)
+	
+	def processBinary(self, op, args):
+		"""
+		Runs one binary protocol request and returns the reply bytes
+			op: Request opcode
+			args: Unpacked request record
+		"""
+		if op == OP_MOVE:
+			self.notifyMove(*args)
+			return bytes((BINARY_ACK,))
+		elif op == OP_WALL:
+			self.notifyWall(*args)
+			return bytes((BINARY_ACK,))
+		elif op == OP_INVALIDATE:
+			self.notifyInvalidate(*args)
+			return bytes((BINARY_ACK,))
+		elif op == OP_GETMOVE:
+			move = self.getMove()
+			return MOVE_REPLY.pack(MOVE_PAWN if move.move else MOVE_WALL, move.r1, move.c1, move.r2, move.c2)
+		elif op == OP_ADJ:
+			return packLocs(self.getAdjacent(*args))
+		elif op == OP_PATH:
+			return packLocs(self.getPath(*args))
+		else:
+			raise ProtocolError("Unknown opcode: "+str(op))
+	
+	def notifyMove(self, plyid, r, c):
+		ply = self._getPlayer(plyid)
+		self.board.applyMove(HashablePlayerMove(ply.id+1, True, ply.location[0], ply.location[1], r, c))
+	
+	def notifyWall(self, plyid, r1, c1, r2, c2):
+		ply = self._getPlayer(plyid)
+		self.board.applyMove(HashablePlayerMove(ply.id+1, False, r1, c1, r2, c2))
+	
+	def notifyInvalidate(self, plyid):
+		self.board.invalidate(self._getPlayer(plyid).id)
+	
+	def getAdjacent(self, r, c):
+		return self.board.getAdjacent((r, c))
+	
+	def getPath(self, r1, c1, r2, c2):
+		return self.board.findPathToLoc((r1, c1), (r2, c2)) or []
+	
+	def getMove(self):
+		"""
+		Searches for the move to make
+		"""
+		if self.board.activeplayers == 1:
+			return getMoveToGoal(self.board, self.me)
+		finishby = getTime() + self.searchtime
+		bestmove, score, depth = iterativeDeepening(self.board, self.me, finishby, table=self.table, orderer=self.orderer)
+		print("\tGot move: {} (score {}, depth {})".format(bestmove, score, depth))
+		return bestmove or getMoveToGoal(self.board, self.me)
+
+class MuxGame(threading.Thread):
+	"""
+	Runs the commands of one game on a multiplexed connection, so a long search doesn't hold up the other games
+	"""
+	
+	def __init__(self, gameid, handler):
+		threading.Thread.__init__(self, daemon=True)
+		self.gameid = gameid
+		self.handler = handler
+		self.queue = queue.Queue()
+		self.session = None
+	
+	def run(self):
+		while True:
+			line = self.queue.get()
+			if line is None:
+				break
+			if line == "end":
+				self.handler.writeMux(self.gameid, "ack\n")
+				break
+			try:
+				if self.session is None:
+					if not line.startswith("new "):
+						raise ProtocolError("Game not started")
+					self.session = Session(line[4:], self.handler.server.searchtime)
+					reply = "ack\n"
+				else:
+					reply = self.session.process(line)
+			except Exception as err:
+				# Always reply, or the client waits for one until it times out
+				reply = "err {}: {}\n".format(type(err).__name__, err)
+			try:
+				self.handler.writeMux(self.gameid, reply)
+			except OSError:
+				break
+
+class AIHandler(socketserver.StreamRequestHandler):
+	"""
+	Handles one client connection, which plays one game
+	"""
+	
+	def setup(self):
+		socketserver.StreamRequestHandler.setup(self)
+		self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+	
+	def _readLine(self):
+		line = self.rfile.readline()
+		if not line:
+			return None
+		return str(line, "ascii").rstrip("\r\n")
+	
+	def handle(self):
+		print("Connection received from {}:{}".format(*self.client_address[:2]))
+		try:
+			header = self._readLine()
+			if header == HELLO_MUX:
+				self.wfile.write(bytes(HELLO_MUX + "\n", "ascii"))
+				self._handleMux()
+				return
+			binary = header == HELLO_BINARY
+			if binary:
+				self.wfile.write(bytes(HELLO_BINARY + "\n", "ascii"))
+				header = self._readLine()
+			if header is None:
+				return
+			session = Session(header, self.server.searchtime)
+			self.wfile.write(b"ack\n")
+			
+			if binary:
+				self._handleBinary(session)
+			else:
+				self._handleText(session)
+		except (ProtocolError, ValueError, IndexError, AssertionError, struct.error) as err:
+			# Same as the Lua server: drop the connection on anything unexpected
+			print("Connection terminated due to protocol errors:", err)
+	
+	def _handleText(self, session):
+		while True:
+			line = self._readLine()
+			if line is None:
+				print("Connection closed")
+				break
+			self.wfile.write(bytes(session.process(line), "ascii"))
+	
+	def _handleBinary(self, session):
+		while True:
+			op = self.rfile.read(1)
+			if not op:
+				print("Connection closed")
+				break
+			record = REQUEST_RECORDS.get(op[0])
+			if record is None:
+				raise ProtocolError("Unknown opcode: "+str(op[0]))
+			data = self.rfile.read(record.size)
+			if len(data) != record.size:
+				print("Connection closed")
+				break
+			self.wfile.write(session.processBinary(op[0], record.unpack(data)))
+	
+	def writeMux(self, gameid, reply):
+		with self.writelock:
+			self.wfile.write(bytes("{} {}".format(gameid, reply), "ascii"))
+	
+	def _handleMux(self):
+		self.writelock = threading.Lock()
+		games = {}
+		try:
+			while True:
+				line = self._readLine()
+				if line is None:
+					print("Connection closed")
+					break
+				gameid, _, cmd = line.partition(" ")
+				if cmd.startswith("new "):
+					if gameid in games:
+						games[gameid].queue.put(None)
+					game = games[gameid] = MuxGame(gameid, self)
+					game.start()
+					game.queue.put(cmd)
+				elif cmd == "end":
+					game = games.pop(gameid, None)
+					if game:
+						game.queue.put(cmd)
+					else:
+						self.writeMux(gameid, "ack\n")
+				elif gameid in games:
+					games[gameid].queue.put(cmd)
+				else:
+					self.writeMux(gameid, "err Unknown game\n")
+		finally:
+			for game in games.values():
+				game.queue.put(None)
+
+class AIServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+	"""
+	Threaded TCP server running AIHandler for each connection
+	"""
+	allow_reuse_address = True
+	daemon_threads = True
+	
+	def __init__(self, address, searchtime=SEARCH_TIME):
+		self.searchtime = searchtime
+		socketserver.TCPServer.__init__(self, address, AIHandler)
+
+def main():
+	parser = argparse.ArgumentParser(description="WanderingQuoridors AI server")
+	parser.add_argument("--host", default="localhost", help="Address to listen on")
+	parser.add_argument("--port", type=int, default=PORT, help="Port to listen on")
+	parser.add_argument("--time", type=float, default=SEARCH_TIME, help="Seconds to search for each move")
+	args = parser.parse_args()
+	
+	server = AIServer((args.host, args.port), args.time)
+	print("Server starting on {}:{}".format(args.host, args.port))
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+
+if __name__ == "__main__":
+	main()
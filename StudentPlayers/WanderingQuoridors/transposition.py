@@ -0,0 +1,49 @@
+"""
+Transposition table for the alphabeta search
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+# Bound types of a stored score
+EXACT = 0
+LOWER = 1 # Real score is >= the stored score
+UPPER = 2 # Real score is <= the stored score
+
+class TranspositionTable:
+	"""
+	Fixed size hash table of previously searched positions, indexed by Zobrist hash.
+	Each slot holds one entry; a new entry replaces the old one unless the old one is for
+	the same position and was searched deeper.
+	"""
+	
+	def __init__(self, size=1 << 18):
+		"""
+		size: Number of entries in the table
+		"""
+		self.size = size
+		self.entries = [None]*size
+	
+	def get(self, key):
+		"""
+		Returns the (depth, bound, score, bestmove) tuple stored for key, or None if there isn't one.
+		"""
+		entry = self.entries[key % self.size]
+		if entry and entry[0] == key:
+			return entry[1:]
+		return None
+	
+	def put(self, key, depth, bound, score, bestmove):
+		"""
+		Stores the result of searching the position with hash key to depth.
+		"""
+		i = key % self.size
+		entry = self.entries[i]
+		if entry and entry[0] == key and entry[1] > depth:
+			return
+		self.entries[i] = (key, depth, bound, score, bestmove)
+	
+	def clear(self):
+		"""
+		Removes every entry from the table.
+		"""
+		self.entries = [None]*self.size
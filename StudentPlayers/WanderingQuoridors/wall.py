@@ -7,26 +7,65 @@ Author: Joseph Moreyn (jbm6331@rit.edu)
 from Model.interface import BOARD_DIM
 from .hashableplayermove import HashablePlayerMove as PlayerMove
 
+# Every valid wall occupies one of 128 canonical slots, numbered by the wall's midpoint (r,c),
+# 1 <= r,c < BOARD_DIM. Horizontal walls use slots 0-63, and vertical walls use slots 64-127.
+SLOT_DIM = BOARD_DIM-1
+NUM_SLOTS = 2*SLOT_DIM*SLOT_DIM
+VERT_SLOT_OFFSET = SLOT_DIM*SLOT_DIM
+
+def wallSlot(r1, c1, r2, c2):
+    """
+    Returns the canonical slot of the valid wall with the passed coordinates
+    """
+    if r1 == r2:
+        return (r1-1)*SLOT_DIM + c1
+    else:
+        return VERT_SLOT_OFFSET + r1*SLOT_DIM + c1-1
+
+# Coordinates (r1,c1,r2,c2) of the wall in each slot
+WALL_SLOTS = [None]*NUM_SLOTS
+for _r in range(1, BOARD_DIM):
+    for _c in range(1, BOARD_DIM):
+        WALL_SLOTS[wallSlot(_r, _c-1, _r, _c+1)] = (_r, _c-1, _r, _c+1)
+        WALL_SLOTS[wallSlot(_r-1, _c, _r+1, _c)] = (_r-1, _c, _r+1, _c)
+
+# Bitmask of the slots that can no longer be used once a wall is placed in each slot.
+# A wall blocks its own slot, the crossing wall with the same midpoint, and the two
+# walls of the same orientation that would overlap it.
+WALL_CONFLICTS = [0]*NUM_SLOTS
+for _r in range(1, BOARD_DIM):
+    for _c in range(1, BOARD_DIM):
+        _h = wallSlot(_r, _c-1, _r, _c+1)
+        _v = wallSlot(_r-1, _c, _r+1, _c)
+        WALL_CONFLICTS[_h] = 1 << _h | 1 << _v
+        WALL_CONFLICTS[_v] = 1 << _h | 1 << _v
+        if _c != 1:           WALL_CONFLICTS[_h] |= 1 << (_h-1)
+        if _c != BOARD_DIM-1: WALL_CONFLICTS[_h] |= 1 << (_h+1)
+        if _r != 1:           WALL_CONFLICTS[_v] |= 1 << (_v-SLOT_DIM)
+        if _r != BOARD_DIM-1: WALL_CONFLICTS[_v] |= 1 << (_v+SLOT_DIM)
+
 class Wall:
     """
-    A reprensentation of a wall.
+    A reprensentation of a wall. Walls are immutable, so boards share them instead of copying them.
+    Use getWall or slotWall to get the shared instance of a valid wall instead of making a new one.
     """
+    __slots__ = ("owner", "r1", "c1", "r2", "c2")
+    
     def __init__(self, ownerid, r1, c1, r2, c2):
-        self.owner = ownerid
-        self._r1 = r1
-        self._c1 = c1
-        self._r2 = r2
-        self._c2 = c2
-        
-    # Make them 'read only'
-    @property
-    def r1(self): return self._r1
-    @property
-    def c1(self): return self._c1
-    @property
-    def r2(self): return self._r2
-    @property
-    def c2(self): return self._c2
+        _set = object.__setattr__
+        _set(self, "owner", ownerid)
+        _set(self, "r1", r1)
+        _set(self, "c1", c1)
+        _set(self, "r2", r2)
+        _set(self, "c2", c2)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("Wall is immutable")
+    __delattr__ = __setattr__
+    
+    def __reduce__(self):
+        # Unpickled walls are the shared instances too
+        return (getWall, (self.owner, self.r1, self.c1, self.r2, self.c2))
 
     def loc1(self):
         """
@@ -40,6 +79,12 @@ class Wall:
         """
         return (self.r2, self.c2)
     
+    def slot(self):
+        """
+        Returns the canonical slot of the wall. Only meaningful for valid walls.
+        """
+        return wallSlot(self.r1, self.c1, self.r2, self.c2)
+    
     def isHoriz(self):
         """
         Returns true if wall is horizontal
@@ -90,19 +135,9 @@ class Wall:
     
     def intersects(self, other):
         """
-        Checks if self instersects with wall other
+        Checks if self instersects with wall other. Both walls must be valid.
         """
-        mp1 = ((self.r1+self.r2)/2, (self.c1+self.c2)/2)
-        mp2 = ((other.r1+other.r2)/2, (other.c1+other.c2)/2)
-        if mp1 == mp2:
-            return True
-        
-        if self.isHoriz() == other.isHoriz():
-            if mp1 == other.loc1():
-                return True
-            elif mp1 == other.loc2():
-                return True
-        return False
+        return WALL_CONFLICTS[self.slot()] >> other.slot() & 1 == 1
 
     def toMove(self):
         """
@@ -112,8 +147,30 @@ class Wall:
 
     def __str__(self):
         return "Wall@<%d,%d - %d,%d>" % (self.r1, self.c1, self.r2, self.c2)
+    __repr__ = __str__
     def __eq__(self, other):
-        return self.r1 == other.r1 and self.r2 == self.r2 and \
+        if not isinstance(other, Wall):
+            return NotImplemented
+        return self.r1 == other.r1 and self.r2 == other.r2 and \
             self.c1 == other.c1 and self.c2 == other.c2
     def __hash__(self):
-        return hash(self.r1) + hash(self.c1) + hash(self.r2) + hash(self.c2)
+        return hash((self.r1, self.c1, self.r2, self.c2))
+
+# Shared instances of the wall in every slot for each owner, -1 being a wall without an owner
+_SLOT_WALLS = {owner: [Wall(owner, *coords) for coords in WALL_SLOTS] for owner in range(-1, 4)}
+_WALLS = {(w.owner, w.r1, w.c1, w.r2, w.c2): w for walls in _SLOT_WALLS.values() for w in walls}
+
+def slotWall(slot, ownerid=-1):
+    """
+    Returns the shared Wall in the passed slot
+    """
+    return _SLOT_WALLS[ownerid][slot]
+
+def getWall(ownerid, r1, c1, r2, c2):
+    """
+    Returns the shared Wall with the passed owner and coordinates, or a new Wall if they aren't a valid wall
+    """
+    w = _WALLS.get((ownerid, r1, c1, r2, c2))
+    if w is None:
+        w = Wall(ownerid, r1, c1, r2, c2)
+    return w
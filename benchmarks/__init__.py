@@ -0,0 +1,10 @@
+"""
+Benchmarks for the WanderingQuoridors board and search code.
+Run from the directory containing quoridor.py, for example:
+    python -m benchmarks.boardbench
+
+The positions they run on are in positions.txt, made by python -m benchmarks.gencorpus
+
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
@@ -0,0 +1,270 @@
+"""
+Microbenchmarks of the board primitives and the search, run on the standard corpus for both board classes.
+Every run is appended to a history file and compared with an earlier run, to catch regressions.
+
+Usage: python -m benchmarks.boardbench [options]
+
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+import sys, argparse, json, os, time, platform, subprocess
+from time import perf_counter
+from StudentPlayers.WanderingQuoridors import board as boardmodule, bitboard as bitboardmodule
+from StudentPlayers.WanderingQuoridors.board import Board, _goal_settings
+from StudentPlayers.WanderingQuoridors.bitboard import BitBoard
+from StudentPlayers.WanderingQuoridors.wall import getWall
+from StudentPlayers.WanderingQuoridors.playerData import alphabeta, batcheval
+from .corpus import loadCorpus
+
+HISTORY_FILE = os.path.join(os.path.dirname(__file__), "history.jsonl")
+BOARD_CLASSES = {"Board": Board, "BitBoard": BitBoard}
+# Positions of the corpus to run on. The search benchmarks are too slow to use all of them.
+NUM_POSITIONS = 40
+# A benchmark that gets this much slower than the baseline is reported as a regression
+REGRESSION_THRESHOLD = 0.10
+
+def clearCaches(boards=()):
+    """
+    Empties the distance caches shared by all boards, and the path blocker caches of boards, a list of
+    (board, plyid) tuples, so a run of a benchmark doesn't reuse the work of another or of an earlier run
+    """
+    boardmodule._distancefields.clear()
+    bitboardmodule._distancelayers.clear()
+    for board, plyid in boards:
+        board.pathblockers = [None]*len(board.players)
+
+def _wallMoves(board):
+    """Every wall that fits on the board, legal or not"""
+    for r in range(0, 8):
+        for c in range(1, 9):
+            yield getWall(-1, r, c, r+2, c)
+    for r in range(1, 9):
+        for c in range(0, 8):
+            yield getWall(-1, r, c, r, c+2)
+
+# Each benchmark takes a list of (board, plyid) tuples, and returns the number of operations done
+# and the seconds they took. Setup that isn't being measured is done before starting the clock.
+
+def benchCopy(boards):
+    start = perf_counter()
+    for board, plyid in boards:
+        for i in range(20):
+            board.copy()
+    return len(boards)*20, perf_counter()-start
+
+def benchAddWall(boards):
+    work = []
+    for board, plyid in boards:
+        for wall in _wallMoves(board):
+            if board.checkWall(wall):
+                work.append((board.copy(), getWall(plyid, wall.r1, wall.c1, wall.r2, wall.c2)))
+                if len(work) % 10 == 0:
+                    break
+    start = perf_counter()
+    for board, wall in work:
+        board.addWall(wall)
+    return len(work), perf_counter()-start
+
+def benchCheckWall(boards):
+    walls = list(_wallMoves(None))
+    start = perf_counter()
+    for board, plyid in boards:
+        for wall in walls:
+            board.checkWall(wall)
+    return len(boards)*len(walls), perf_counter()-start
+
+def benchBfs(boards):
+    start = perf_counter()
+    ops = 0
+    for board, plyid in boards:
+        for p in board.players:
+            board._bfs(p.location, _goal_settings[p.id][1])
+            ops += 1
+    return ops, perf_counter()-start
+
+def benchFindPathToGoal(boards):
+    start = perf_counter()
+    ops = 0
+    for board, plyid in boards:
+        for p in board.players:
+            board.findPathToGoal(p.location, p.id)
+            ops += 1
+    return ops, perf_counter()-start
+
+def benchGetAdjacentHop(boards):
+    start = perf_counter()
+    ops = 0
+    for board, plyid in boards:
+        for i in range(20):
+            for p in board.players:
+                list(board.getAdjacentHop(p.location))
+                ops += 1
+    return ops, perf_counter()-start
+
+def benchGenerateNext(boards):
+    start = perf_counter()
+    for board, plyid in boards:
+        list(board.generateNext(plyid))
+    return len(boards), perf_counter()-start
+
+def benchEvaluate(boards):
+    start = perf_counter()
+    for board, plyid in boards:
+        board.evaluate(plyid)
+    return len(boards), perf_counter()-start
+
+def benchEvaluateLeaves(boards):
+    work = []
+    for board, plyid in boards:
+        leaves = []
+        for move in list(board.generateNext(plyid)):
+            board.push(move)
+            if not board.isTerminal():
+                leaves.append((board.wallmask, [p and p.location for p in board.players]))
+            board.pop()
+        work.append((leaves, plyid))
+    start = perf_counter()
+    for leaves, plyid in work:
+        batcheval.evaluateLeaves(leaves, plyid)
+    return sum(len(leaves) for leaves, plyid in work), perf_counter()-start
+
+def benchAlphabeta(depth):
+    def bench(boards):
+        start = perf_counter()
+        for board, plyid in boards:
+            alphabeta(board, depth, plyid)
+        return len(boards), perf_counter()-start
+    return bench
+
+BENCHMARKS = [
+    ("copy", benchCopy),
+    ("addWall", benchAddWall),
+    ("checkWall", benchCheckWall),
+    ("_bfs", benchBfs),
+    ("findPathToGoal", benchFindPathToGoal),
+    ("getAdjacentHop", benchGetAdjacentHop),
+    ("generateNext", benchGenerateNext),
+    ("evaluate", benchEvaluate),
+    ("alphabeta depth 1", benchAlphabeta(1)),
+    ("alphabeta depth 2", benchAlphabeta(2)),
+]
+if batcheval is not None:
+    # Needs NumPy. Per leaf, to compare with evaluate.
+    BENCHMARKS.insert(BENCHMARKS.index(("evaluate", benchEvaluate))+1, ("evaluateLeaves", benchEvaluateLeaves))
+
+def runBenchmarks(classes, repeat, only=None, count=NUM_POSITIONS):
+    """
+    Runs the benchmarks on count positions of the standard corpus for every board class in classes.
+    Returns a dict of the best seconds per operation, by "Class.benchmark" name.
+    """
+    results = {}
+    for clsname in classes:
+        boards = loadCorpus(BOARD_CLASSES[clsname], count)
+        for name, bench in BENCHMARKS:
+            fullname = "{}.{}".format(clsname, name)
+            if only and not any(s in fullname for s in only):
+                continue
+            best = None
+            for i in range(repeat):
+                clearCaches(boards)
+                ops, seconds = bench(boards)
+                if best is None or seconds/ops < best:
+                    best = seconds/ops
+            results[fullname] = best
+            print("%-32s %12.2f us" % (fullname, best*1e6))
+            sys.stdout.flush()
+    return results
+
+def gitCommit():
+    """The current git commit, or None if it can't be found"""
+    try:
+        out = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL)
+        return str(out, "ascii").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def loadHistory(filename):
+    history = []
+    if os.path.exists(filename):
+        with open(filename) as f:
+            for line in f:
+                try:
+                    history.append(json.loads(line))
+                except ValueError:
+                    pass
+    return history
+
+def findBaseline(history, commit=None):
+    """The last run in history, or the last run of the given commit"""
+    for record in reversed(history):
+        if commit is None or (record.get("commit") or "").startswith(commit):
+            return record
+    return None
+
+def compare(results, baseline, threshold):
+    """
+    Prints the change of every benchmark from the baseline run.
+    Returns the names of the benchmarks that got slower by more than threshold.
+    """
+    print()
+    print("Compared with %s (%s):" % (baseline.get("commit") or "unknown commit", baseline["time"]))
+    regressions = []
+    for name, seconds in sorted(results.items()):
+        old = baseline["results"].get(name)
+        if old is None:
+            print("%-32s %12.2f us  (new)" % (name, seconds*1e6))
+            continue
+        change = seconds/old - 1
+        note = ""
+        if change > threshold:
+            note = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            note = "  faster"
+        print("%-32s %12.2f us  %+7.1f%%%s" % (name, seconds*1e6, change*100, note))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the board primitives and the search")
+    parser.add_argument("-c", "--classes", default="Board,BitBoard", help="Comma separated board classes to benchmark")
+    parser.add_argument("-k", "--only", action="append", help="Only run benchmarks whose name contains this. May be repeated")
+    parser.add_argument("-p", "--positions", type=int, default=NUM_POSITIONS, help="Number of positions to run on")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Runs of each benchmark; the best is kept")
+    parser.add_argument("--history", default=HISTORY_FILE, help="JSON lines file of earlier runs")
+    parser.add_argument("--baseline", default=None, help="Compare with the last run of this commit instead of the last run")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Slowdown reported as a regression")
+    parser.add_argument("--no-save", action="store_true", help="Don't add this run to the history")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 if anything regressed")
+    options = parser.parse_args()
+
+    classes = options.classes.split(",")
+    for clsname in classes:
+        if clsname not in BOARD_CLASSES:
+            parser.error("Unknown board class: " + clsname)
+
+    results = runBenchmarks(classes, options.repeat, options.only, options.positions)
+    record = {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": gitCommit(),
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "positions": options.positions,
+        "results": results,
+    }
+
+    regressions = []
+    baseline = findBaseline(loadHistory(options.history), options.baseline)
+    if baseline:
+        regressions = compare(results, baseline, options.threshold)
+    if not options.no_save:
+        with open(options.history, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    if regressions:
+        print()
+        print("%d regressions" % len(regressions))
+        if options.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Fixed set of positions for the benchmarks, stored in positions.txt.
+Regenerate it with gencorpus.py; changing it makes new benchmark runs incomparable with the history.
+
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+import os
+from StudentPlayers.WanderingQuoridors.bitboard import BitBoard
+from StudentPlayers.WanderingQuoridors.position import readPositions, loadPosition
+
+CORPUS_FILE = os.path.join(os.path.dirname(__file__), "positions.txt")
+
+def standardCorpus(count=None, filename=CORPUS_FILE):
+    """
+    Returns the text of the positions the benchmarks run on.
+    If count is given, returns that many, taken evenly from the 2 and 4 player positions.
+    """
+    positions = readPositions(filename)
+    if count is None:
+        return positions
+    two = [text for text in positions if text.split()[1].count(",") == 1]
+    four = [text for text in positions if text.split()[1].count(",") == 3]
+    return two[:count - count//2] + four[:count//2]
+
+def loadCorpus(cls=BitBoard, count=None, filename=CORPUS_FILE):
+    """Returns (board, tomove) for every position of standardCorpus, as boards of class cls"""
+    return [loadPosition(text, cls) for text in standardCorpus(count, filename)]
@@ -0,0 +1,89 @@
+"""
+Generates a corpus of positions by sampling seeded self-play games of a shallow alphabeta search.
+Every so often a player makes a random move instead, so the games don't all play out the same way.
+
+Usage: python -m benchmarks.gencorpus [options]
+
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+import sys, argparse, random
+from StudentPlayers.WanderingQuoridors.board import Player
+from StudentPlayers.WanderingQuoridors.bitboard import BitBoard
+from StudentPlayers.WanderingQuoridors.playerData import alphabeta
+from StudentPlayers.WanderingQuoridors.position import formatPosition, writePositions
+from .corpus import CORPUS_FILE
+
+PLAYER_HOMES = {
+    2: [(8,4), (0,4)],
+    4: [(8,4), (0,4), (4,0), (4,8)],
+}
+NUM_WALLS = {2: 10, 4: 5}
+# Games that go on longer than this are thrown away
+MAX_TURNS = 200
+
+def selfPlay(nplayers, rng, depth=2, randomness=0.1):
+    """
+    Plays a game and returns the text of the position before every move, or None if it didn't finish
+    """
+    board = BitBoard([Player(i, PLAYER_HOMES[nplayers][i], NUM_WALLS[nplayers]) for i in range(nplayers)])
+    positions = []
+    plyid = 0
+    for turn in range(MAX_TURNS):
+        positions.append(formatPosition(board, plyid))
+        move = None
+        if rng.random() >= randomness:
+            move, score = alphabeta(board, depth, plyid, cheapmin=True)
+        if move is None:
+            move = rng.choice(list(board.generateNext(plyid)))
+        board.applyMove(move)
+        if board.isTerminal():
+            return positions
+        plyid = board.nextPlayer(plyid)
+    return None
+
+def generate(count, nplayers, seed=0, depth=2, randomness=0.1, pergame=4, minturns=4):
+    """
+    Returns the text of count positions sampled from self-play games, at most pergame from each game,
+    leaving out the first minturns moves of every game. Positions that were already taken from another game are skipped.
+    """
+    rng = random.Random("{}-{}".format(seed, nplayers))
+    positions = []
+    seen = set()
+    while len(positions) < count:
+        game = selfPlay(nplayers, rng, depth, randomness)
+        if not game:
+            continue
+        game = [text for text in game[minturns:] if text not in seen]
+        if not game:
+            continue
+        sample = rng.sample(game, min(pergame, len(game), count-len(positions)))
+        seen.update(sample)
+        positions.extend(sample)
+        print("\r%d/%d %d player positions" % (len(positions), count, nplayers), end="")
+        sys.stdout.flush()
+    print()
+    return positions
+
+def main():
+    parser = argparse.ArgumentParser(description="Samples positions from self-play games")
+    parser.add_argument("-o", "--output", default=CORPUS_FILE, help="File to write the positions to")
+    parser.add_argument("-n", "--two-player", type=int, default=1500, help="Number of 2 player positions")
+    parser.add_argument("-f", "--four-player", type=int, default=1000, help="Number of 4 player positions")
+    parser.add_argument("-d", "--depth", type=int, default=2, help="Search depth of the players")
+    parser.add_argument("--randomness", type=float, default=0.1, help="Chance of making a random move instead")
+    parser.add_argument("--per-game", type=int, default=4, help="Positions taken from each game")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the games")
+    options = parser.parse_args()
+
+    positions = generate(options.two_player, 2, options.seed, options.depth, options.randomness, options.per_game)
+    positions += generate(options.four_player, 4, options.seed, options.depth, options.randomness, options.per_game)
+    header = "Generated by benchmarks/gencorpus.py with --two-player {} --four-player {} --depth {} " \
+        "--randomness {} --per-game {} --seed {}\nFormat: see StudentPlayers/WanderingQuoridors/position.py".format(
+        options.two_player, options.four_player, options.depth, options.randomness, options.per_game, options.seed)
+    writePositions(options.output, positions, header)
+    print("Wrote %d positions to %s" % (len(positions), options.output))
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,13 @@ Runs multiple 2-player games, alternating player pairings.
 
 Place this file in the same directory as quoridor.py
 Usage: multiplegames.py player1 player2 [num games per pairing] [animation speed] [cfgfile]
+Games are played in this process; see tournament.py for running them in parallel.
 
 Author: Adam Oest (amo9149@rit.edu)
 """
 
-import sys, itertools, operator, random, subprocess
+import sys, itertools, operator, random, argparse
+import tournament
 
 def main():
     """Run the engine and start the game"""
@@ -56,30 +58,19 @@ def play_game(matchup):
 
     print ("Game: %s Matchup: %s" % (game, matchup))
     
-    modules = [mod for mod in matchup]           
-    res = str(subprocess.Popen([sys.executable,'quoridor.py','UI=False','ANIMATION_SPEED=%s' % (sys.argv[4] if len(sys.argv) > 4 else 500),'STDOUT_LOGGING=False','FILE_LOGGING=True','PLAYER_MODULES=%s'%','.join(modules), sys.argv[5] if (len(sys.argv) > 5) else 'config.txt'], stdout=subprocess.PIPE).communicate()[0])
-       
-    try:
-        winningPlayer = [int(res.strip().split()[1]) - 1]
-    except:
-        if 'winner' in res:
-            winningPlayer = []
-        else:
-            print ("Output was %s" % res.strip())
-            print ("Parsing error occurred")
-            winningPlayer = int(input("Enter winner id (1-2), 0 for no winner")) - 1
+    modules = [mod for mod in matchup]
+    options = argparse.Namespace(backend='engine', quiet=True, file_logging=True,
+        animation_speed=int(sys.argv[4]) if len(sys.argv) > 4 else 500,
+        config=sys.argv[5] if len(sys.argv) > 5 else 'config.txt')
+    result = tournament.playGame(tournament.Job(str(game), modules), options)
     
-    try:    
-        if winningPlayer != []:
-            for p in winningPlayer:
-                if p in (0,1):
-                    playerWins[modules[p]] += 1
-                    print ("\tWinner: %s" % (modules[p]))                      
-        else:
-            print ("\tNo winner.")
-            
-    except:
-        print ("Input error")
+    if result.error:
+        print ("\tGame crashed:\n%s" % result.error)
+    elif result.winner is not None:
+        playerWins[modules[result.winner-1]] += 1
+        print ("\tWinner: %s" % (modules[result.winner-1]))
+    else:
+        print ("\tNo winner.")
         
     game += 1
 
@@ -0,0 +1,294 @@
+"""
+Round-robin and Swiss tournament scheduler with Elo and Glicko ratings.
+Plays rounds of 2 or 4 player games through tournament.py until every player's rating is
+separated from the others' or the round limit is hit. Tables whose players are already
+separated are skipped, so later rounds only play the pairings that still carry information.
+The state is saved after every round, so a stopped run continues where it left off.
+
+Place this file in the same directory as quoridor.py
+Usage: scheduler.py [options] player1 player2 [player3 ...]
+
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+import sys, argparse, itertools, random, json, os, math
+import tournament
+
+# Starting Glicko rating and rating deviation
+INITIAL_RATING = 1500.0
+INITIAL_RD = 350.0
+# Rating deviations don't shrink below this
+MIN_RD = 30.0
+# Elo K factor
+ELO_K = 32.0
+# z score of the confidence intervals
+CONFIDENCE_Z = 1.96
+
+_Q = math.log(10) / 400
+
+def _g(rd):
+    return 1 / math.sqrt(1 + 3 * _Q*_Q * rd*rd / (math.pi*math.pi))
+
+def expectedScore(rating, other, otherrd=0.0):
+    """Expected score of a player rated rating against one rated other with deviation otherrd"""
+    return 1 / (1 + 10 ** (-_g(otherrd) * (rating - other) / 400))
+
+class Rating:
+    """
+    A player's Glicko-1 rating and deviation, plus an Elo rating for comparison
+    """
+
+    def __init__(self, rating=INITIAL_RATING, rd=INITIAL_RD, elo=INITIAL_RATING, games=0, wins=0):
+        self.rating = rating
+        self.rd = rd
+        self.elo = elo
+        self.games = games
+        self.wins = wins
+
+    def interval(self):
+        """Returns the (low, high) confidence interval of the Glicko rating"""
+        return self.rating - CONFIDENCE_Z*self.rd, self.rating + CONFIDENCE_Z*self.rd
+
+    def separatedFrom(self, other):
+        """True if the confidence intervals of the two ratings don't overlap"""
+        low, high = self.interval()
+        otherlow, otherhigh = other.interval()
+        return high < otherlow or otherhigh < low
+
+    def toJSON(self):
+        return {"rating": self.rating, "rd": self.rd, "elo": self.elo, "games": self.games, "wins": self.wins}
+
+    @staticmethod
+    def fromJSON(data):
+        return Rating(data["rating"], data["rd"], data["elo"], data["games"], data["wins"])
+
+def pairwiseScores(players, winner):
+    """
+    Splits the result of a game into (player, opponent, score) tuples.
+    The winner beats every other player. Losers aren't compared with each other, since a game
+    only says who won. If nobody won, every pair is a draw.
+        players: Player names, in seat order
+        winner: Seat (1-4) of the winner, or None
+    """
+    if winner is None:
+        return [(a, b, 0.5) for a, b in itertools.permutations(players, 2)]
+    name = players[winner-1]
+    scores = []
+    for other in players:
+        if other != name:
+            scores.append((name, other, 1.0))
+            scores.append((other, name, 0.0))
+    return scores
+
+def updateRatings(ratings, results):
+    """
+    Updates ratings with a list of (players, winner) game results, treating them as one Glicko rating period.
+    Elo ratings are updated game by game.
+    """
+    outcomes = dict((name, []) for name in ratings)
+    for players, winner in results:
+        for name in players:
+            ratings[name].games += 1
+        if winner is not None:
+            ratings[players[winner-1]].wins += 1
+
+        # Elo, shared between the opponents of each player
+        elo = dict((name, ratings[name].elo) for name in players)
+        k = ELO_K / (len(players)-1)
+        for name, other, score in pairwiseScores(players, winner):
+            ratings[name].elo += k * (score - expectedScore(elo[name], elo[other]))
+            outcomes[name].append((other, score))
+
+    # Glicko, using the ratings from before the period
+    old = dict((name, (r.rating, r.rd)) for name, r in ratings.items())
+    for name, games in outcomes.items():
+        if not games:
+            continue
+        rating, rd = old[name]
+        dinv = 0.0
+        delta = 0.0
+        for other, score in games:
+            otherrating, otherrd = old[other]
+            g = _g(otherrd)
+            e = expectedScore(rating, otherrating, otherrd)
+            dinv += g*g * e * (1-e)
+            delta += g * (score - e)
+        dinv *= _Q*_Q
+        denom = 1/(rd*rd) + dinv
+        ratings[name].rating = rating + _Q / denom * delta
+        ratings[name].rd = max(math.sqrt(1/denom), MIN_RD)
+
+def tableSeatings(table):
+    """Returns every rotation of the seats of a table, so each player plays from each seat once"""
+    return [tuple(table[i:] + table[:i]) for i in range(len(table))]
+
+def roundRobinTables(players, size):
+    """Returns every table of size players"""
+    return [list(table) for table in itertools.combinations(players, size)]
+
+def swissTables(players, size, ratings, rng):
+    """
+    Groups players with similar ratings into tables of size players.
+    Players left over when the count doesn't divide evenly sit the round out, chosen at random.
+    """
+    order = sorted(players, key=lambda name: -ratings[name].rating)
+    extra = len(order) % size
+    for i in range(extra):
+        order.pop(rng.randrange(len(order)))
+    return [order[i:i+size] for i in range(0, len(order), size)]
+
+def isInformative(table, ratings):
+    """True if some pair of players at the table isn't separated yet"""
+    for a, b in itertools.combinations(table, 2):
+        if not ratings[a].separatedFrom(ratings[b]):
+            return True
+    return False
+
+class Scheduler:
+    """
+    Plans and plays rounds, updating the ratings after each.
+    """
+
+    def __init__(self, players, size=2, mode="roundrobin", seed=0):
+        """
+        players: Player module names
+        size: Players in each game, 2 or 4
+        mode: "roundrobin" or "swiss"
+        seed: Seed for the choices made when planning rounds
+        """
+        self.players = list(players)
+        self.size = size
+        self.mode = mode
+        self.seed = seed
+        self.round = 0
+        self.ratings = dict((name, Rating()) for name in self.players)
+
+    def planRound(self):
+        """
+        Returns the Jobs of the next round, leaving out the tables that are no longer informative.
+        """
+        rng = random.Random("{}-{}".format(self.seed, self.round))
+        if self.mode == "swiss":
+            tables = swissTables(self.players, self.size, self.ratings, rng)
+        else:
+            tables = roundRobinTables(self.players, self.size)
+
+        jobs = []
+        for table in tables:
+            if not isInformative(table, self.ratings):
+                continue
+            rng.shuffle(table)
+            for seating in tableSeatings(table):
+                jobs.append(tournament.Job("r{}-g{}".format(self.round+1, len(jobs)+1), seating))
+        return jobs
+
+    def finishRound(self, jobs, results):
+        """
+        Applies the GameResults of a round's jobs and moves on to the next round.
+        The results are applied in the order of jobs, whatever order they finished in.
+        """
+        order = dict((job.id, i) for i, job in enumerate(jobs))
+        results = sorted(results, key=lambda result: order[result.id])
+        updateRatings(self.ratings, [(result.players, result.winner) for result in results if not result.error])
+        self.round += 1
+
+    def separated(self):
+        """True once every player's rating is separated from the next best player's"""
+        order = self.standings()
+        for a, b in zip(order, order[1:]):
+            if not self.ratings[a].separatedFrom(self.ratings[b]):
+                return False
+        return True
+
+    def standings(self):
+        """Returns the player names, best first"""
+        return sorted(self.players, key=lambda name: -self.ratings[name].rating)
+
+    def printStandings(self):
+        print("After round %s:" % self.round)
+        for rank, name in enumerate(self.standings(), 1):
+            r = self.ratings[name]
+            low, high = r.interval()
+            print("%3d. %-24s Glicko %6.0f [%6.0f, %6.0f]  Elo %6.0f  won %d/%d" % \
+                (rank, name, r.rating, low, high, r.elo, r.wins, r.games))
+
+    def toJSON(self):
+        return {
+            "players": self.players,
+            "size": self.size,
+            "mode": self.mode,
+            "seed": self.seed,
+            "round": self.round,
+            "ratings": dict((name, r.toJSON()) for name, r in self.ratings.items()),
+        }
+
+    @staticmethod
+    def fromJSON(data):
+        scheduler = Scheduler(data["players"], data["size"], data["mode"], data["seed"])
+        scheduler.round = data["round"]
+        scheduler.ratings = dict((name, Rating.fromJSON(r)) for name, r in data["ratings"].items())
+        return scheduler
+
+    def save(self, filename):
+        """Writes the state to filename, replacing it only once the new state is completely written"""
+        temp = filename + ".tmp"
+        with open(temp, "w") as f:
+            json.dump(self.toJSON(), f, indent=1)
+        os.replace(temp, filename)
+
+    @staticmethod
+    def load(filename):
+        with open(filename) as f:
+            return Scheduler.fromJSON(json.load(f))
+
+def main():
+    parser = argparse.ArgumentParser(description="Rates player modules with round-robin or Swiss tournaments")
+    parser.add_argument("players", nargs="+", help="Player module names. Must be unique")
+    parser.add_argument("-t", "--table", type=int, choices=(2, 4), default=2, help="Players in each game")
+    parser.add_argument("-m", "--mode", choices=("roundrobin", "swiss"), default="roundrobin", help="How tables are chosen")
+    parser.add_argument("-r", "--rounds", type=int, default=10, help="Maximum number of rounds")
+    parser.add_argument("--min-rounds", type=int, default=1, help="Rounds to play before stopping early")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for seatings and byes")
+    parser.add_argument("-s", "--state", default=None, help="File to save the state to after every round, and resume from")
+    tournament.addArguments(parser)
+    options = parser.parse_args()
+
+    if len(set(options.players)) != len(options.players):
+        parser.error("Player names must be unique. Clone your player module to play against yourself.")
+    if len(options.players) < options.table:
+        parser.error("Need at least {} players".format(options.table))
+
+    if options.state and os.path.exists(options.state):
+        scheduler = Scheduler.load(options.state)
+        if sorted(scheduler.players) != sorted(options.players) or scheduler.size != options.table or scheduler.mode != options.mode:
+            parser.error("{} is from a tournament with different players or settings".format(options.state))
+        print("Resuming after round %s" % scheduler.round)
+        # The games of the interrupted round are in the results file, if there is one
+        options.resume = True
+    else:
+        scheduler = Scheduler(options.players, options.table, options.mode, options.seed)
+    tournament.checkResultsArgument(parser, options)
+
+    while scheduler.round < options.rounds:
+        if scheduler.round >= options.min_rounds and scheduler.separated():
+            print("Every rating is separated, stopping")
+            break
+        jobs = scheduler.planRound()
+        if not jobs:
+            print("No informative tables left, stopping")
+            break
+        print("Round %s: %s games" % (scheduler.round+1, len(jobs)))
+
+        results = []
+        for result in tournament.runLoggedGames(jobs, options):
+            results.append(result)
+            if result.error:
+                print("Game: %s Matchup: %s crashed:\n%s" % (result.id, result.players, result.error))
+        scheduler.finishRound(jobs, results)
+        if options.state:
+            scheduler.save(options.state)
+        scheduler.printStandings()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Headless game simulator. Plays games between player modules through their init, last_move,
+move and player_invalidated hooks, without the engine's UI, animation and logging overhead.
+Moves are checked with the WanderingQuoridors board.
+
+Place this file in the same directory as quoridor.py
+Usage: simulator.py [options] player1 player2 [player3 player4]
+
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+import sys, argparse, importlib, time, traceback, threading
+from collections import namedtuple
+from Model.interface import PlayerMove
+from StudentPlayers.WanderingQuoridors.board import Player
+from StudentPlayers.WanderingQuoridors.bitboard import BitBoard
+from StudentPlayers.WanderingQuoridors.wall import Wall
+
+# Starting locations, by number of players
+PLAYER_HOMES = {
+    2: [(8,4), (0,4)],
+    4: [(8,4), (0,4), (4,0), (4,8)],
+}
+# Same defaults as the engine's config
+NUM_WALLS = {2: 10, 4: 5}
+PLAYER_MOVE_LIMIT = 10.0
+# Games that go on longer than this are a draw
+MAX_TURNS = 1000
+
+# The outcome of a game.
+#   winner: Id (1-4) of the winning player, or None for a draw
+#   valid: Ids of the players that were not invalidated
+#   turns: Number of moves made
+#   moves: Every move made, as (playerId, move, r1, c1, r2, c2) tuples
+#   invalidated: (playerId, reason) for every invalidated player, in order
+SimResult = namedtuple("SimResult", "winner valid turns moves invalidated")
+
+class NullLogger:
+    """Logger that discards everything"""
+    def write(self, msg):
+        pass
+    def error(self, msg):
+        pass
+
+class PrintLogger:
+    """Logger that prints everything, prefixed with the player's id"""
+    def __init__(self, prefix):
+        self.prefix = prefix
+    def write(self, msg):
+        print(self.prefix, msg)
+    def error(self, msg):
+        print(self.prefix, "ERROR:", msg)
+
+def loadPlayer(name):
+    """Imports and returns the player module StudentPlayers.name"""
+    return importlib.import_module("StudentPlayers." + name)
+
+def checkMove(board, playerId, move):
+    """
+    Returns None if move is a legal move for playerId on board, or the reason it isn't.
+    """
+    if not isinstance(move, PlayerMove):
+        return "returned {!r} instead of a PlayerMove".format(move)
+    if move.playerId != playerId:
+        return "moved as player {}".format(move.playerId)
+    ply = board.players[playerId-1]
+    if move.move:
+        if (move.r1, move.c1) != ply.location:
+            return "moved from {} but is at {}".format((move.r1, move.c1), ply.location)
+        if (move.r2, move.c2) not in set(board.getAdjacentHop(ply.location)):
+            return "can't move to {}".format((move.r2, move.c2))
+    else:
+        if ply.walls <= 0:
+            return "has no walls left"
+        if not board.checkWall(Wall(playerId-1, move.r1, move.c1, move.r2, move.c2)):
+            return "can't place wall {}".format(move)
+    return None
+
+class Simulator:
+    """
+    Plays one game between player modules.
+    A player is invalidated, like in the engine, if a hook raises, it makes an illegal move,
+    or its move takes longer than the move limit.
+    """
+
+    def __init__(self, players, numwalls=None, movelimit=PLAYER_MOVE_LIMIT, maxturns=MAX_TURNS, verbose=False):
+        """
+        players: Player module names (or modules), in seat order. There must be 2 or 4.
+        numwalls: Walls each player starts with. Defaults to NUM_WALLS.
+        movelimit: Seconds a move may take, or None for no limit
+        maxturns: Number of moves after which the game is a draw
+        verbose: Print the players' log messages and every move
+        """
+        if len(players) not in PLAYER_HOMES:
+            raise ValueError("Can't play a game with {} players".format(len(players)))
+        self.modules = [loadPlayer(p) if isinstance(p, str) else p for p in players]
+        self.homes = PLAYER_HOMES[len(players)]
+        self.numwalls = NUM_WALLS[len(players)] if numwalls is None else numwalls
+        self.movelimit = movelimit
+        self.maxturns = maxturns
+        self.verbose = verbose
+
+    def _call(self, i, hook, *args):
+        """
+        Calls a hook of player i with its data followed by args.
+        Returns (True, result), or (False, reason) if it raised.
+        """
+        if hook != "init":
+            args = (self.data[i],) + args
+        try:
+            return True, getattr(self.modules[i], hook)(*args)
+        except Exception:
+            return False, "raised in {}:\n{}".format(hook, traceback.format_exc())
+
+    def _callTimed(self, i, hook, limit, *args):
+        """
+        Like _call, but gives up waiting for the hook after limit seconds (if limit isn't None) and returns
+        (False, reason). The hook is left running in a daemon thread; the player is invalidated, so whatever
+        it returns is never used.
+        """
+        if limit is None:
+            return self._call(i, hook, *args)
+        result = []
+        thread = threading.Thread(target=lambda: result.append(self._call(i, hook, *args)), daemon=True)
+        thread.start()
+        thread.join(limit)
+        if thread.is_alive():
+            return False, "didn't {} within {:.2f}s".format(hook, limit)
+        return result[0]
+
+    def _invalidate(self, i, reason):
+        """Invalidates player i and tells the others, invalidating any that fail to take it"""
+        queue = [(i, reason)]
+        while queue:
+            i, reason = queue.pop(0)
+            if not self.valid[i]:
+                continue
+            if self.verbose:
+                print("Player {} invalidated: {}".format(i+1, reason))
+            self.valid[i] = False
+            self.invalidated.append((i+1, reason))
+            self.board.invalidate(i)
+            for j in range(len(self.modules)):
+                if self.valid[j]:
+                    ok, result = self._call(j, "player_invalidated", i+1)
+                    if ok:
+                        self.data[j] = result
+                    else:
+                        queue.append((j, result))
+
+    def _result(self, winner, turns):
+        return SimResult(winner, [i+1 for i, v in enumerate(self.valid) if v], turns, self.moves, self.invalidated)
+
+    def play(self):
+        """Plays the game to the end and returns a SimResult"""
+        n = len(self.modules)
+        self.board = BitBoard([Player(i, self.homes[i], self.numwalls) for i in range(n)])
+        self.valid = [True]*n
+        self.moves = []
+        self.invalidated = []
+        self.data = [None]*n
+
+        failed = []
+        for i in range(n):
+            logger = PrintLogger("[{}]".format(i+1)) if self.verbose else NullLogger()
+            ok, result = self._call(i, "init", logger, i+1, self.numwalls, tuple(self.homes))
+            if ok:
+                self.data[i] = result
+            else:
+                failed.append((i, result))
+        for i, reason in failed:
+            self._invalidate(i, reason)
+
+        turn = 0
+        cur = 0
+        while turn < self.maxturns:
+            if sum(self.valid) <= 1:
+                # Everyone else was invalidated
+                winner = self.valid.index(True)+1 if any(self.valid) else None
+                return self._result(winner, turn)
+            while not self.valid[cur]:
+                cur = (cur+1) % n
+
+            start = time.time()
+            ok, move = self._callTimed(cur, "move", self.movelimit)
+            elapsed = time.time() - start
+            if not ok:
+                self._invalidate(cur, move)
+                continue
+            if self.movelimit is not None and elapsed > self.movelimit:
+                self._invalidate(cur, "took {:.2f}s to move".format(elapsed))
+                continue
+            reason = checkMove(self.board, cur+1, move)
+            if reason:
+                self._invalidate(cur, reason)
+                continue
+
+            turn += 1
+            if self.verbose:
+                print(turn, move, "{:.2f}s".format(elapsed))
+            self.board.applyMove(move)
+            self.moves.append((move.playerId, move.move, move.r1, move.c1, move.r2, move.c2))
+            for j in range(n):
+                if self.valid[j]:
+                    ok, result = self._call(j, "last_move", move.getCopy())
+                    if ok:
+                        self.data[j] = result
+                    else:
+                        self._invalidate(j, result)
+
+            p = self.board.isTerminal()
+            if p:
+                return self._result(p.id+1, turn)
+            cur = (cur+1) % n
+        return self._result(None, turn)
+
+def main():
+    parser = argparse.ArgumentParser(description="Plays games between player modules without the engine")
+    parser.add_argument("players", nargs="+", help="Player module names, in seat order")
+    parser.add_argument("-n", "--games", type=int, default=1, help="Number of games to play")
+    parser.add_argument("--walls", type=int, default=None, help="Walls each player starts with")
+    parser.add_argument("--move-limit", type=float, default=PLAYER_MOVE_LIMIT, help="Seconds a move may take")
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS, help="Moves before the game is a draw")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every move and the players' logs")
+    options = parser.parse_args()
+
+    wins = {}
+    for game in range(1, options.games+1):
+        start = time.time()
+        result = Simulator(options.players, options.walls, options.move_limit, options.max_turns, options.verbose).play()
+        for plyid, reason in result.invalidated:
+            print("\tPlayer %s (%s) invalidated: %s" % (plyid, options.players[plyid-1], reason.splitlines()[0]))
+        if result.winner is None:
+            print("Game %s: No winner after %s turns (%.1fs)" % (game, result.turns, time.time()-start))
+        else:
+            name = options.players[result.winner-1]
+            wins[name] = wins.get(name, 0) + 1
+            print("Game %s: Player %s (%s) won in %s turns (%.1fs)" % (game, result.winner, name, result.turns, time.time()-start))
+    for name, count in sorted(wins.items(), key=lambda item: -item[1]):
+        print(name, "won", count, "games")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Plays many games in a pool of worker processes, with structured results.
+Each worker imports the engine and player modules once and reuses them for every game it plays,
+instead of starting a new Python process per game like multiplegames.py used to.
+
+Place this file in the same directory as quoridor.py
+Usage: tournament.py [options] player1 player2 [player3 ...]
+
+Author: Alex Parrill (amp9612@rit.edu)
+Author: Joseph Moreyn (jbm6331@rit.edu)
+"""
+
+import sys, argparse, itertools, random, time, traceback, io, operator, json, os
+import multiprocessing
+from collections import namedtuple
+
+# A game to play.
+#   id: Name of the game, unique within a tournament
+#   players: Player module names, in seat order (seat 1 first)
+Job = namedtuple("Job", "id players")
+
+# The outcome of a game.
+#   winner: Seat (1-4) of the winning player, or None if nobody won
+#   valid: Seats of the players that were not invalidated
+#   turns: Number of moves made, if the backend knows it
+#   seconds: Wall clock time the game took
+#   error: Traceback if the game crashed, otherwise None
+GameResult = namedtuple("GameResult", "id players winner valid turns seconds error")
+
+def winnerName(result):
+    """Returns the module name of the winner of a GameResult, or None"""
+    if result.winner is None:
+        return None
+    return result.players[result.winner-1]
+
+def playEngineGame(job, options):
+    """
+    Plays a game in this process with the Engine controller.
+    Returns (winner, valid, turns)
+    """
+    from Engine import run
+    from Engine.config import Config
+
+    cfg = Config(options.config)
+    cfg.setParam("UI", "False")
+    cfg.setParam("STDOUT_LOGGING", "False")
+    cfg.setParam("FILE_LOGGING", str(bool(options.file_logging)))
+    cfg.setParam("ANIMATION_SPEED", str(options.animation_speed))
+    cfg.setParam("PLAYER_MODULES", ",".join(job.players))
+    winner, valid = run(cfg)
+    return (int(winner) if winner else None), sorted(int(p) for p in valid or ()), None
+
+def playSimulatedGame(job, options):
+    """
+    Plays a game in this process with the headless simulator.
+    Returns (winner, valid, turns)
+    """
+    from simulator import Simulator
+
+    result = Simulator(job.players, movelimit=options.move_limit, maxturns=options.max_turns, verbose=not options.quiet).play()
+    return result.winner, result.valid, result.turns
+
+# Functions that play a single game: backend(job, options) -> (winner, valid, turns)
+BACKENDS = {
+    "engine": playEngineGame,
+    "sim": playSimulatedGame,
+}
+
+def playGame(job, options):
+    """
+    Plays job with the backend chosen in options and returns its GameResult.
+    Never raises; a crash is recorded in the result's error field.
+    """
+    start = time.time()
+    try:
+        if options.quiet:
+            # contextlib.redirect_stdout needs Python 3.4, so swap it by hand
+            stdout, sys.stdout = sys.stdout, io.StringIO()
+            try:
+                winner, valid, turns = BACKENDS[options.backend](job, options)
+            finally:
+                sys.stdout = stdout
+        else:
+            winner, valid, turns = BACKENDS[options.backend](job, options)
+        error = None
+    except (Exception, SystemExit):
+        winner, valid, turns = None, [], None
+        error = traceback.format_exc()
+    return GameResult(job.id, list(job.players), winner, valid, turns, time.time()-start, error)
+
+# Options of the worker processes, set by _initWorker
+_options = None
+
+def _initWorker(options):
+    global _options
+    _options = options
+
+def _playWorker(job):
+    return playGame(job, _options)
+
+def runGames(jobs, options):
+    """
+    Plays every Job in jobs and yields their GameResults as they finish, in no particular order.
+    Uses options.workers processes, or plays the games in this process if it is 0.
+    """
+    if options.workers <= 0:
+        for job in jobs:
+            yield playGame(job, options)
+        return
+
+    pool = multiprocessing.Pool(options.workers, _initWorker, (options,))
+    try:
+        for result in pool.imap_unordered(_playWorker, jobs):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+class ResultLog:
+    """
+    Append-only JSON lines file of GameResults. Each result is written and flushed as soon as
+    its game finishes, so an interrupted run only loses the games that were being played.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = None
+
+    def load(self):
+        """
+        Returns the results in the file as a dict by game id. Later lines replace earlier ones.
+        Partly written lines, from runs that were killed while writing them, are ignored.
+        """
+        results = {}
+        if not os.path.exists(self.filename):
+            return results
+        with open(self.filename) as f:
+            for line in f:
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    continue
+                results[data["id"]] = GameResult(*(data[field] for field in GameResult._fields))
+        return results
+
+    def append(self, result):
+        if self.file is None:
+            partial = False
+            if os.path.exists(self.filename) and os.path.getsize(self.filename) > 0:
+                with open(self.filename, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    partial = f.read(1) != b"\n"
+            self.file = open(self.filename, "a")
+            if partial:
+                # Finish off the partly written last line, so the new results start on a line of their own
+                self.file.write("\n")
+        self.file.write(json.dumps(result._asdict()) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+def runLoggedGames(jobs, options):
+    """
+    Like runGames, but also appends the results to options.results, if set.
+    With options.resume, jobs that already have a result without an error in the file aren't played again;
+    their old results are yielded first instead.
+    """
+    if not options.results:
+        for result in runGames(jobs, options):
+            yield result
+        return
+
+    log = ResultLog(options.results)
+    try:
+        todo = jobs
+        if options.resume:
+            done = log.load()
+            todo = []
+            for job in jobs:
+                result = done.get(job.id)
+                if result and not result.error:
+                    if result.players != list(job.players):
+                        raise ValueError("{} has game {} with players {}, not {}".format(
+                            options.results, job.id, result.players, list(job.players)))
+                    yield result
+                else:
+                    todo.append(job)
+        for result in runGames(todo, options):
+            log.append(result)
+            yield result
+    finally:
+        log.close()
+
+def seatings(players, table, games, seed=None):
+    """
+    Returns Jobs that play every seating of table players chosen from players, games times over.
+    Each repetition is shuffled.
+    """
+    rng = random.Random(seed)
+    jobs = []
+    for rep in range(games):
+        pairings = list(itertools.permutations(players, table))
+        rng.shuffle(pairings)
+        for pairing in pairings:
+            jobs.append(Job("{}".format(len(jobs)+1), pairing))
+    return jobs
+
+def addArguments(parser):
+    """Adds the options used by playGame and runGames to an ArgumentParser"""
+    parser.add_argument("-w", "--workers", type=int, default=multiprocessing.cpu_count(),
+        help="Number of worker processes. 0 plays every game in this process")
+    parser.add_argument("-b", "--backend", choices=sorted(BACKENDS), default="engine",
+        help="What plays the games")
+    parser.add_argument("--config", default="config.txt", help="Engine config file")
+    parser.add_argument("--animation-speed", type=int, default=0, help="Engine ANIMATION_SPEED")
+    parser.add_argument("--file-logging", action="store_true", help="Turn on the engine's FILE_LOGGING")
+    parser.add_argument("--move-limit", type=float, default=10.0, help="Seconds a move may take (sim backend)")
+    parser.add_argument("--max-turns", type=int, default=1000, help="Moves before the game is a draw (sim backend)")
+    parser.add_argument("-v", "--verbose", dest="quiet", action="store_false",
+        help="Show what the players and engine print")
+    parser.add_argument("-o", "--results", default=None, help="JSON lines file to append every game's result to")
+    parser.add_argument("--resume", action="store_true",
+        help="Don't replay the games that already have a result in the results file")
+
+def checkResultsArgument(parser, options):
+    """Stops a new run from mixing its results with an old run's"""
+    if options.results and not options.resume and os.path.exists(options.results):
+        parser.error("{} already exists. Use --resume to continue that run".format(options.results))
+
+def printRankings(results, players):
+    """Prints how many games each player won"""
+    wins = dict((player, 0) for player in players)
+    for result in results:
+        name = winnerName(result)
+        if name is not None:
+            wins[name] += 1
+    rank = 1
+    for player, count in sorted(wins.items(), key=operator.itemgetter(1), reverse=True):
+        print("Rank", rank, "is player", player, "with", count, "wins.")
+        rank += 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Plays every seating of the given players against each other")
+    parser.add_argument("players", nargs="+", help="Player module names. Must be unique")
+    parser.add_argument("-n", "--games", type=int, default=1, help="Number of times to play every seating")
+    parser.add_argument("-t", "--table", type=int, choices=(2, 4), default=2, help="Players in each game")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for shuffling the seatings")
+    addArguments(parser)
+    options = parser.parse_args()
+    checkResultsArgument(parser, options)
+
+    if len(set(options.players)) != len(options.players):
+        parser.error("Player names must be unique. Clone your player module to play against yourself.")
+    if len(options.players) < options.table:
+        parser.error("Need at least {} players".format(options.table))
+
+    jobs = seatings(options.players, options.table, options.games, options.seed)
+    print("Will play %s games" % len(jobs))
+
+    results = []
+    for result in runLoggedGames(jobs, options):
+        results.append(result)
+        if result.error:
+            print("Game: %s Matchup: %s crashed:\n%s" % (result.id, result.players, result.error))
+        else:
+            print("Game: %s Matchup: %s Winner: %s (%.1fs)" % (result.id, result.players, winnerName(result), result.seconds))
+    printRankings(results, options.players)
+
+if __name__ == "__main__":
+    main()